@@ -0,0 +1,270 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from models import URLRequest
+import repository
+from cache import link_cache
+from codegen import code_generator, new_edit_id, MAX_CODE_ATTEMPTS
+from config import settings
+from canonical import url_digest
+from security import check_url_security
+from Routes.shorten import BASE_URL, FRONTEND_URL
+from datetime import datetime, timezone
+import codecs
+import json
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# Number of items validated, deduped and inserted per round trip
+BULK_BATCH_SIZE = settings.bulk_batch_size
+
+# Longest item the parsers will buffer while waiting for the rest of it, so one
+# huge or unterminated item cannot pull the whole body into memory
+BULK_MAX_ITEM_SIZE = settings.bulk_max_item_size
+
+DUPLICATE_KEY_ERROR = 11000
+
+
+async def _iter_text(chunks):
+    """Decode a byte stream as UTF-8 without splitting multi-byte characters."""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    async for chunk in chunks:
+        yield decoder.decode(chunk)
+    yield decoder.decode(b"", final=True)
+
+
+async def _iter_ndjson(chunks):
+    """Yield one parsed item (or the JSONDecodeError) per non-empty line."""
+    buffer = ""
+    async for text in _iter_text(chunks):
+        buffer += text
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield e
+        if len(buffer) > BULK_MAX_ITEM_SIZE:
+            raise ValueError(f"Line longer than {BULK_MAX_ITEM_SIZE} characters")
+    if buffer.strip():
+        try:
+            yield json.loads(buffer)
+        except json.JSONDecodeError as e:
+            yield e
+
+
+async def _iter_json_array(chunks):
+    """Incrementally yield the elements of a top-level JSON array."""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    started = False
+    async for text in _iter_text(chunks):
+        buffer += text
+        while True:
+            buffer = buffer.lstrip()
+            if not buffer:
+                break
+            if not started:
+                if buffer[0] != "[":
+                    raise ValueError("Body must be a JSON array")
+                started = True
+                buffer = buffer[1:]
+            elif buffer[0] == ",":
+                buffer = buffer[1:]
+            elif buffer[0] == "]":
+                return
+            else:
+                try:
+                    item, end = decoder.raw_decode(buffer)
+                except json.JSONDecodeError as e:
+                    # Incomplete, or malformed: only worth waiting for while still within the item limit
+                    if len(buffer) > BULK_MAX_ITEM_SIZE:
+                        raise ValueError(f"Element is not valid JSON within {BULK_MAX_ITEM_SIZE} characters: {e.msg}")
+                    break
+                yield item
+                buffer = buffer[end:]
+    raise ValueError("Unterminated JSON array")
+
+
+def _parse_item(raw) -> tuple:
+    """Validate one bulk item; return (URLRequest, expiration_date) or raise ValueError."""
+    if isinstance(raw, json.JSONDecodeError):
+        raise ValueError(f"Invalid JSON: {raw}")
+    if not isinstance(raw, dict):
+        raise ValueError("Each item must be a JSON object")
+    try:
+        request = URLRequest(**raw)
+    except ValidationError as e:
+        raise ValueError(e.errors()[0]["msg"])
+
+    if not check_url_security(request.long_url):
+        raise ValueError("URL failed security checks.")
+
+    expiration_date = request.expiration_date
+    if expiration_date:
+        if expiration_date.tzinfo is None:
+            expiration_date = expiration_date.replace(tzinfo=timezone.utc)
+        else:
+            expiration_date = expiration_date.astimezone(timezone.utc)
+        if expiration_date < datetime.now(timezone.utc):
+            raise ValueError("Expiration date cannot be in the past.")
+
+    return request, expiration_date
+
+
+def _link_result(index: int, status: str, long_url: str, short_code: str, edit_id: str) -> dict:
+    return {
+        "index": index,
+        "status": status,
+        "long_url": long_url,
+        "shortened_url": f"{BASE_URL}/{short_code}",
+        "edit_link": f"{FRONTEND_URL}/edit/{edit_id}",
+        "qr_code_url": f"{BASE_URL}/qrcode/{short_code}",
+    }
+
+
+def _error_result(index: int, detail: str) -> dict:
+    return {"index": index, "status": "error", "detail": detail}
+
+
+async def _shorten_batch(batch: list) -> list:
+    """Shorten a batch of (index, raw item) pairs with one dedupe query and one insert_many."""
+    results = {}
+    pending = []
+    for index, raw in batch:
+        try:
+            request, expiration_date = _parse_item(raw)
+        except ValueError as e:
+            results[index] = _error_result(index, str(e))
+            continue
+        pending.append((index, request, expiration_date, url_digest(request.long_url)))
+
+    # Dedupe against the collection with a single $in query on canonical URL digests,
+    # and within the batch itself
+    existing = await repository.lookup_many_by_url_hash(list({long_url_hash for *_, long_url_hash in pending})) if pending else {}
+    new_items = []
+    for item in pending:
+        index, request, _, long_url_hash = item
+        if long_url_hash in existing:
+            entry = existing[long_url_hash]
+            if entry:
+                results[index] = _link_result(index, "already_shortened", request.long_url, entry["short_code"], entry["edit_id"])
+            continue  # A duplicate of an earlier item in this batch resolves after insert
+
+        existing[long_url_hash] = None
+        new_items.append(item)
+
+    raced = []
+    for attempt in range(MAX_CODE_ATTEMPTS):
+        if not new_items:
+            break
+
+        documents = []
+        for index, request, expiration_date, long_url_hash in new_items:
+            documents.append({
+                "short_code": request.custom_alias or await code_generator.next_code(),
+                "long_url": request.long_url,
+                "long_url_hash": long_url_hash,
+                "expiration_date": expiration_date,
+                "edit_id": new_edit_id(),
+            })
+
+        failed = {}
+        for error in await repository.insert_many_urls(documents):
+            failed[error["index"]] = error
+
+        retry = []
+        for position, (item, document) in enumerate(zip(new_items, documents)):
+            index, request, _, long_url_hash = item
+            error = failed.get(position)
+            if error is None:
+                existing[long_url_hash] = document
+                results[index] = _link_result(index, "created", request.long_url, document["short_code"], document["edit_id"])
+            elif error.get("code") != DUPLICATE_KEY_ERROR:
+                results[index] = _error_result(index, error.get("errmsg", "Error saving data to database"))
+            elif "long_url_hash" in error.get("keyPattern", {}):
+                raced.append(long_url_hash)  # Shortened concurrently by another request
+            elif request.custom_alias and "short_code" in error.get("keyPattern", {}):
+                results[index] = _error_result(index, f"Custom alias '{request.custom_alias}' is already in use.")
+            else:
+                retry.append(item)  # Generated code or edit_id collided; try again with fresh ones
+
+        await link_cache.invalidate(*(document["short_code"] for position, document in enumerate(documents) if position not in failed))
+        new_items = retry
+
+    for index, *_ in new_items:
+        results[index] = _error_result(index, "Could not allocate a unique short code")
+
+    if raced:
+        existing.update(await repository.lookup_many_by_url_hash(raced))
+
+    # Items deduped against an earlier item in this batch point at the row just inserted
+    for index, request, _, long_url_hash in pending:
+        if index not in results:
+            entry = existing.get(long_url_hash)
+            if entry:
+                results[index] = _link_result(index, "already_shortened", request.long_url, entry["short_code"], entry["edit_id"])
+            else:
+                results[index] = _error_result(index, "Duplicate of a failed item in this batch")
+
+    return [results[index] for index, _ in batch]
+
+
+async def _stream_results(items):
+    batch = []
+    index = 0
+    try:
+        async for raw in items:
+            batch.append((index, raw))
+            index += 1
+            if len(batch) >= BULK_BATCH_SIZE:
+                for result in await _shorten_batch(batch):
+                    yield json.dumps(result) + "\n"
+                batch = []
+    except ValueError as e:
+        logger.error(f"Malformed bulk body after {index} items: {e}")
+        if batch:
+            for result in await _shorten_batch(batch):
+                yield json.dumps(result) + "\n"
+        yield json.dumps(_error_result(index, f"Malformed request body: {e}")) + "\n"
+        return
+
+    if batch:
+        for result in await _shorten_batch(batch):
+            yield json.dumps(result) + "\n"
+
+
+class _BodyStreamingResponse(StreamingResponse):
+    """StreamingResponse for handlers that are still reading the request body.
+
+    The stock response listens for http.disconnect on receive() while it
+    streams, which swallows the body chunks request.stream() is waiting for
+    and hangs the request. A client going away still surfaces as
+    ClientDisconnect from request.stream() or as a failed send.
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+@router.post("/shorten/bulk")
+async def bulk_shorten(request: Request):
+    """Shorten a JSON array or NDJSON stream of URLRequest items.
+
+    Items are processed in batches and results are streamed back as NDJSON,
+    one line per item in input order, so memory stays flat for any batch size.
+    """
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        items = _iter_ndjson(request.stream())
+    else:
+        items = _iter_json_array(request.stream())
+
+    return _BodyStreamingResponse(_stream_results(items), media_type="application/x-ndjson")
@@ -1,107 +1,73 @@
-from fastapi import APIRouter, HTTPException
-from database import collection
+from fastapi import APIRouter, HTTPException, Request
+import repository
+import analytics
+from pymongo.errors import DuplicateKeyError
+from cache import link_cache
 from models import URLEditRequest
 import re
-import os
+from config import settings
+from responses import etag_matches
 from datetime import datetime, timezone
-from dotenv import load_dotenv
 import logging
-from fastapi.responses import JSONResponse
-from Routes.shorten import generate_qr_code
+from fastapi.responses import ORJSONResponse, Response
 
 
 router = APIRouter()
 
-load_dotenv()
-
 logger = logging.getLogger(__name__)
 
-# Get the BASE_URL from the environment variables
-BASE_URL = os.getenv("BASE_URL")
+# Get the BASE_URL from the settings
+BASE_URL = settings.base_url
 if not BASE_URL:
     logger.error("❌ BASE_URL not found in .env file")
     raise ValueError("❌ BASE_URL not found in .env file")
 
-FRONTEND_URL = os.getenv("FRONTEND_URL")
+FRONTEND_URL = settings.frontend_url
 if not FRONTEND_URL:
     logger.error("❌ FRONTEND_URL not found in .env file")
     raise ValueError("❌ FRONTEND_URL not found in .env file")
 
 
+def edit_etag(version: int) -> str:
+    """ETag of an edit page; edit_url bumps the link's version on every change."""
+    return f'"v{version}"'
+
+
 @router.get("/edit/{edit_id}")
-async def get_url_details(edit_id: str):
-    url_data = collection.find_one({"edit_id": edit_id}, {"_id": 0, "long_url": 1, "custom_alias": 1, "expiration_date": 1, "short_code": 1})
+async def get_url_details(request: Request, edit_id: str):
+    url_data = await repository.get_edit_details(edit_id)
 
     if not url_data:
         raise HTTPException(status_code=404, detail="Edit link is invalid or expired")
-    
-    # Ensure expiration_date is None if missing
-    expiration_date = url_data.get("expiration_date", None)
 
-        # Convert expiration_date if it's stored in MongoDB's `{"$date": ...}` format
-    if isinstance(expiration_date, dict) and "$date" in expiration_date:
-        expiration_date = expiration_date["$date"]
-        
-    
-    # Convert to ISO format if it's a datetime object
-    elif isinstance(expiration_date, datetime):
-        expiration_date = expiration_date.isoformat()
+    # Polling clients revalidate every time and get a bodiless 304 until the link is edited
+    etag = edit_etag(url_data.get("version", 0))
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
 
-    return {
+    # expiration_date is a datetime or None (storage parses legacy values, see scripts/normalize_expiration.py);
+    # orjson writes datetimes as ISO 8601 directly
+    return ORJSONResponse(content={
         "long_url": url_data["long_url"],
         "custom_alias": url_data.get("custom_alias"),
-        "expiration_date": expiration_date,
+        "expiration_date": url_data.get("expiration_date"),
         "short_code": url_data["short_code"],
         "shortened_url": f"{BASE_URL}/{url_data['short_code']}"  # ✅ Add shortened URL
-    }
+    }, headers=headers)
 
 
 @router.put("/edit/{edit_id}")
 async def edit_url(edit_id: str, request: URLEditRequest):
     
-      # Log the received expiration_date
-    print("Received expiration_date:", request.expiration_date)  # This will print to your server logs
-    
     """Edit an existing shortened URL."""
-    try:
-        existing_entry = collection.find_one({"edit_id": edit_id})
-        
-        if not existing_entry:
-            raise HTTPException(status_code=404, detail="URL not found")
-
-        # Prevent editing expired URLs
-        expiration_date = existing_entry.get("expiration_date")
-        if expiration_date:
-        # Handle MongoDB stored format
-            # Handle MongoDB stored format ({"$date": ...})
-            if isinstance(expiration_date, dict) and "$date" in expiration_date:
-                expiration_date = expiration_date["$date"]
-            
-            
-
-            
-        
-            # ✅ Ensure expiration_date is always timezone-aware (UTC)
-            if expiration_date.tzinfo is None:
-                expiration_date = expiration_date.replace(tzinfo=timezone.utc)
-        
-             # Ensure comparison is timezone-aware
-            expiration_date = expiration_date.astimezone(timezone.utc)
-            current_time = datetime.now(timezone.utc)
-
-            # Compare expiration time with the current time (UTC)
-            if current_time > expiration_date:
-                raise HTTPException(status_code=400, detail="Cannot edit an expired URL.")
+    logger.debug(f"Received expiration_date: {request.expiration_date}")
 
+    try:
         updated_data = {}
 
-        # Check if the user is updating the custom alias
-        
-        if request.custom_alias and request.custom_alias != existing_entry["short_code"]:
-            # Check if the alias already exists in the collection
-            existing_alias = collection.find_one({"short_code": request.custom_alias})
-            if existing_alias:
-                raise HTTPException(status_code=400, detail=f"Alias '{request.custom_alias}' is already in use.")
+        # Update the alias if one was provided; the unique index on short_code rejects taken aliases
+        if request.custom_alias:
             updated_data["short_code"] = request.custom_alias
 
         # Update expiration date if provided
@@ -139,34 +105,37 @@ async def edit_url(edit_id: str, request: URLEditRequest):
             if expiration_date < datetime.now(timezone.utc):
                 raise HTTPException(status_code=400, detail="Expiration date cannot be in the past.")
 
-        
-        # Update database if updated data exists
-        if updated_data:
-            collection.update_one({"edit_id": edit_id}, {"$set": updated_data})
-
-        # Re-generate QR code if alias or URL changed
-        if "short_code" in updated_data or "long_url" in updated_data:
-            short_url = f"{BASE_URL}/{updated_data.get('short_code', existing_entry['short_code'])}"
-            qr_code = generate_qr_code(short_url)
-            collection.update_one({"edit_id": edit_id}, {"$set": {"qr_code": qr_code}})
-
-        # Return updated info with the original URL, shortened URL, and QR code
-        updated_entry = collection.find_one({"edit_id": edit_id})
-
-            # Ensure expiration_date is in correct format
-        expiration_date = updated_entry.get("expiration_date")
-        if isinstance(expiration_date, datetime):
-            expiration_date = expiration_date.isoformat()
-            
-            
-        return JSONResponse(content={
-            "original_url": updated_entry["long_url"],  # original long URL
+        # Update the link in a single round trip; expired links are excluded by the filter
+        try:
+            existing_entry = await repository.update_by_edit_id(edit_id, updated_data, datetime.now(timezone.utc))
+        except DuplicateKeyError:
+            raise HTTPException(status_code=400, detail=f"Alias '{request.custom_alias}' is already in use.")
+
+        if not existing_entry:
+            # Only the failure path pays for a second lookup to tell "missing" from "expired"
+            if await repository.edit_id_exists(edit_id):
+                raise HTTPException(status_code=400, detail="Cannot edit an expired URL.")
+            raise HTTPException(status_code=404, detail="URL not found")
+
+        # Drop cached redirects for the old code and the (possibly negatively cached) new one
+        await link_cache.invalidate(existing_entry["short_code"], updated_data.get("short_code"))
+
+        short_code = updated_data.get("short_code", existing_entry["short_code"])
+
+        # Click history follows the link; compaction would otherwise treat the old code's rollups as orphans
+        await analytics.rename_rollups(existing_entry["short_code"], short_code)
+
+        return ORJSONResponse(content={
+            "original_url": existing_entry["long_url"],  # original long URL
             "previous_shortened_url": f"{BASE_URL}/{existing_entry['short_code']}",  # previously shortened URL
-            "shortened_url": f"{BASE_URL}/{updated_entry['short_code']}",
+            "shortened_url": f"{BASE_URL}/{short_code}",
             "edit_link": f"{FRONTEND_URL}/edit/{edit_id}",
-            "qr_code": updated_entry.get("qr_code"),
-            "expiration_date": expiration_date
-        })
-        
+            "qr_code_url": f"{BASE_URL}/qrcode/{short_code}",
+            "expiration_date": updated_data["expiration_date"]
+        }, headers={"ETag": edit_etag(existing_entry.get("version", 0) + 1)})
+
+    except HTTPException:
+        raise  # Keep the 400/404 raised above
+
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
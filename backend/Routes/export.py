@@ -0,0 +1,76 @@
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+import export
+import orjson
+import secrets
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "redirects": "text/plain; charset=utf-8"}
+
+
+def require_export_token(request: Request):
+    # Without a configured token the export endpoints don't exist
+    if not export.EXPORT_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not secrets.compare_digest(request.headers.get("x-export-token", ""), export.EXPORT_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid export token")
+
+
+async def _ndjson(links):
+    async for doc in links:
+        yield orjson.dumps(export.entry(doc)) + b"\n"
+
+
+async def _redirects(links, limit: int):
+    written = 0
+    async for doc in links:
+        if export.pages_servable(doc):
+            yield export.redirects_line(doc)
+            written += 1
+            if written >= limit:
+                return
+
+
+@router.get("/export/redirects", include_in_schema=False)
+async def export_redirects(request: Request, format: str = "ndjson", top: int = None, hours: float = 24):
+    """Stream the live redirect map, or the `top` most clicked links over the last `hours`.
+
+    format=ndjson is one {short_code, long_url, expires_at, link} object per
+    line in short_code order (busiest first with `top`); format=redirects is a
+    Cloudflare Pages _redirects file of permanent links. Poll
+    /export/changes from the X-Export-Cursor header to keep a copy current.
+    """
+    require_export_token(request)
+    if format not in MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="Format must be 'ndjson' or 'redirects'")
+    if top is not None and not 1 <= top <= 100000:
+        raise HTTPException(status_code=400, detail="top must be between 1 and 100000")
+
+    cursor = export.snapshot_cursor()
+    if top is None:
+        links = export.live_links()
+    else:
+        try:
+            links = export.iterate(await export.hot_links(top, hours))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    body = _ndjson(links) if format == "ndjson" else _redirects(links, min(top or export.PAGES_REDIRECT_LIMIT, export.PAGES_REDIRECT_LIMIT))
+    return StreamingResponse(body, media_type=MEDIA_TYPES[format], headers={"X-Export-Cursor": cursor, "Cache-Control": "no-store"})
+
+
+@router.get("/export/changes", include_in_schema=False)
+async def export_changes(request: Request, cursor: str = "", limit: int = 1000):
+    """Links created or edited since `cursor`, oldest first, with the cursor for the next call."""
+    require_export_token(request)
+    if not 1 <= limit <= 10000:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 10000")
+    try:
+        return await export.changes(cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -0,0 +1,32 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
+from storage import storage
+import asyncio
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# How long the readiness probe waits for the storage backend to answer
+READINESS_TIMEOUT = 2
+
+
+@router.get("/healthz", include_in_schema=False)
+async def liveness():
+    """Liveness: the process is up and its event loop is answering."""
+    return {"status": "ok"}
+
+
+@router.get("/readyz", include_in_schema=False)
+async def readiness(request: Request):
+    """Readiness: startup has finished and the storage backend answers a ping."""
+    if not getattr(request.app.state, "ready", False):
+        return JSONResponse({"status": "starting"}, status_code=503)
+    try:
+        await asyncio.wait_for(storage.ping(), READINESS_TIMEOUT)
+    except Exception as e:
+        logger.warning(f"Readiness check failed: {e}")
+        return JSONResponse({"status": "unavailable"}, status_code=503)
+    return {"status": "ready"}
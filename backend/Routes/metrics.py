@@ -0,0 +1,52 @@
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+import metrics
+from profiler import profiler, PROFILER_TOKEN
+import secrets
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Prometheus scrape endpoint."""
+    if not metrics.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+def require_profiler_token(request: Request):
+    # Without a configured token the profiler endpoints don't exist
+    if not PROFILER_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not secrets.compare_digest(request.headers.get("x-profiler-token", ""), PROFILER_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid profiler token")
+
+
+@router.post("/debug/profiler/start", include_in_schema=False)
+async def start_profiler(request: Request, interval_ms: float = 5):
+    """Start sampling the event loop thread."""
+    require_profiler_token(request)
+    if not 1 <= interval_ms <= 1000:
+        raise HTTPException(status_code=400, detail="interval_ms must be between 1 and 1000")
+    profiler.start(interval_ms / 1000)  # Called on the loop thread, so that is the one sampled
+    return {"running": True, "interval_ms": profiler.interval * 1000}
+
+
+@router.post("/debug/profiler/stop", include_in_schema=False)
+async def stop_profiler(request: Request):
+    """Stop sampling and return the folded stacks."""
+    require_profiler_token(request)
+    profiler.stop()
+    return PlainTextResponse(profiler.folded())
+
+
+@router.get("/debug/profiler", include_in_schema=False)
+async def get_profile(request: Request):
+    """Folded stacks collected so far (the profiler keeps running)."""
+    require_profiler_token(request)
+    return PlainTextResponse(profiler.folded(), headers={"X-Profiler-Samples": str(profiler.samples)})
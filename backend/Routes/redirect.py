@@ -1,65 +1,93 @@
-from fastapi import APIRouter, HTTPException
-from database import collection
+from fastapi import APIRouter, HTTPException, Request
+import repository
+from cache import link_cache, NOT_FOUND
+from analytics import click_recorder, ANALYTICS_ENABLED
+from admission import client_ip
 from starlette.responses import RedirectResponse
+from config import settings
 from datetime import datetime, timezone
+import random
 import logging
-import re
 
 
 # Set up logging
 
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
+
+# Fraction of redirects that get logged; arguments are only formatted when sampled
+REDIRECT_LOG_SAMPLE_RATE = settings.redirect_log_sample_rate
+
+# Browsers revalidate every click by default; shared caches (CDNs) may serve a link for a while
+REDIRECT_MAX_AGE = settings.redirect_max_age
+REDIRECT_SHARED_MAX_AGE = settings.redirect_shared_max_age
 
 router = APIRouter()
 
 
+def cache_control(expiration_date: datetime = None, now: datetime = None) -> str:
+    """Cache-Control for a redirect; an expiring link is never cached past its expiry."""
+    max_age, shared_max_age = REDIRECT_MAX_AGE, REDIRECT_SHARED_MAX_AGE
+    if expiration_date:
+        remaining = int((expiration_date - (now or datetime.now(timezone.utc))).total_seconds())
+        max_age, shared_max_age = min(max_age, remaining), min(shared_max_age, remaining)
+    if max_age <= 0 and shared_max_age <= 0:
+        return "no-cache"
+    return f"public, max-age={max(max_age, 0)}, s-maxage={max(shared_max_age, 0)}"
+
+
+PERMANENT_CACHE_CONTROL = cache_control()
+
+
+def sampled() -> bool:
+    return random.random() < REDIRECT_LOG_SAMPLE_RATE
+
+
+async def resolve_redirect(short_code: str):
+    """Resolve a short code to (status_code, long_url, cache_control); the last two are None for 404/410.
+
+    Shared by the FastAPI route and the ASGI fast path in fastpath.py.
+    """
+    # Served from the L1/L2 cache when possible; misses are coalesced into one DB read
+    link = await link_cache.get(short_code, repository.resolve)
+
+    if link is NOT_FOUND:
+        if sampled():
+            logger.warning("Short code '%s' not found", short_code)
+        return 404, None, None
+
+    # Expiry is stored as a BSON datetime and expired documents are removed in
+    # bulk by the TTL index, so the hot path is a single comparison with no write
+    long_url, expiration_date = link
+    if not expiration_date:
+        return 302, long_url, PERMANENT_CACHE_CONTROL
+
+    now = datetime.now(timezone.utc)
+    if now >= expiration_date:
+        if sampled():
+            logger.info("URL '%s' has expired.", short_code)
+        return 410, None, None
+    return 302, long_url, cache_control(expiration_date, now)
+
+
+def record_click(short_code: str, request: Request):
+    """Buffer a click event; the analytics task writes it to MongoDB later."""
+    if not ANALYTICS_ENABLED:
+        return
+    headers = request.headers
+    click_recorder.record(short_code, headers.get("referer", ""), headers.get("user-agent", ""), client_ip(request))
+
 
 @router.get("/{short_code}")
-async def redirect_to_long_url(short_code: str):
-    logger.debug("Test log message - Function started.") 
-    url_data = collection.find_one({"short_code": short_code})
-    
-    if not url_data:
-        logger.warning(f"Short code '{short_code}' not found in DB")
+async def redirect_to_long_url(short_code: str, request: Request):
+    status_code, long_url, cache_control_header = await resolve_redirect(short_code)
+
+    if status_code == 404:
         raise HTTPException(status_code=404, detail="URL not found")
-    logger.info(f"Redirecting to {url_data['long_url']}")
+    if status_code == 410:
+        raise HTTPException(status_code=410, detail="URL has expired")
 
-    # Handle expiration date check
-    expiration_date = url_data.get("expiration_date")
-    if expiration_date:
-        logger.debug(f"Stored expiration: {expiration_date}")  # Debugging log
-        logger.debug(f"Expiration date type: {type(expiration_date)}")
-
-        # Ensure expiration_date is in datetime format
-        if isinstance(expiration_date, str):
-            try:
-                expiration_date = datetime.fromisoformat(expiration_date.replace("Z", "+00:00"))
-            except ValueError as e:
-                logger.error(f"Invalid expiration date format in database: {e}")
-                raise HTTPException(status_code=500, detail="Invalid expiration date format in database")
-
-        elif isinstance(expiration_date, dict) and "$date" in expiration_date:
-            try:
-                expiration_date = datetime.fromisoformat(expiration_date["$date"].replace("Z", "+00:00"))
-            except ValueError as e:
-                logger.error(f"Invalid expiration date format in database: {e}")
-                raise HTTPException(status_code=500, detail="Invalid expiration date format in database")
-
-        elif not isinstance(expiration_date, datetime):
-            logger.error("Unexpected expiration_date format in DB.")
-            raise HTTPException(status_code=500, detail="Unexpected expiration date format in database")
-
-        # Ensure comparison is timezone-aware
-        expiration_date = expiration_date.astimezone(timezone.utc)
-        current_time = datetime.now(timezone.utc)
-        # Compare expiration time with the current time (UTC)
-        if current_time > expiration_date:
-            logger.info(f"URL '{short_code}' has expired.")  # Debugging log
-            collection.delete_one({"short_code": short_code})  # Delete expired URL
-            raise HTTPException(status_code=410, detail="URL has expired")
-
-
-        
-   
-    return RedirectResponse(url_data["long_url"])
+    record_click(short_code, request)
+    if sampled():
+        logger.info("Redirecting %s to %s", short_code, long_url)
+
+    return RedirectResponse(long_url, status_code=302, headers={"Cache-Control": cache_control_header})
@@ -1,34 +1,32 @@
 # from pymongo import MongoClient
-import qrcode
-import io
-import base64
-from fastapi.responses import JSONResponse
-from fastapi import APIRouter, HTTPException
+from fastapi.responses import JSONResponse, Response
+from fastapi import APIRouter, HTTPException, Request
 from models import URLRequest
-from database import collection
-import shortuuid
+import repository
+from codegen import code_generator, new_edit_id, MAX_CODE_ATTEMPTS
+from canonical import url_digest
+from pymongo.errors import DuplicateKeyError
+from cache import link_cache, NOT_FOUND
+from qr import get_qr_image, normalize_color, MEDIA_TYPES, ERROR_CORRECTION_LEVELS, QR_BOX_SIZE, QR_ERROR_CORRECTION, QRRenderBusy
 from datetime import datetime,  timezone
 from security import check_url_security
-import os
-from dotenv import load_dotenv
+from config import settings
+from responses import etag_matches
 import logging
 
 
-# Load environment variables
-load_dotenv()
-
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 
-FRONTEND_URL = os.getenv("FRONTEND_URL")
+FRONTEND_URL = settings.frontend_url
 if not FRONTEND_URL:
     logger.error("❌ FRONTEND_URL not found in .env file")
     raise ValueError("❌ FRONTEND_URL not found in .env file")
 
 
-# Get the BASE_URL from the environment variables
-BASE_URL = os.getenv("BASE_URL")
+# Get the BASE_URL from the settings
+BASE_URL = settings.base_url
 if not BASE_URL:
     logger.error("❌ BASE_URL not found in .env file")
     raise ValueError("❌ BASE_URL not found in .env file")
@@ -39,13 +37,15 @@ if not BASE_URL:
 
 router = APIRouter()
 
-def generate_qr_code(url: str) -> str:
-    """Generate a QR code and return it as a base64 string."""
-    qr = qrcode.make(url)
-    buffered = io.BytesIO()
-    qr.save(buffered, format="PNG")
-    qr_base64 = base64.b64encode(buffered.getvalue()).decode("utf-8")
-    return qr_base64
+
+def already_shortened_response(existing_entry: dict) -> JSONResponse:
+    return JSONResponse(content={
+        "message": "This URL has already been shortened.",
+        "already_shortened": True,
+        "shortened_url": f"{BASE_URL}/{existing_entry['short_code']}",
+        "edit_link": f"{FRONTEND_URL}/edit/{existing_entry['edit_id']}",
+        "qr_code_url": f"{BASE_URL}/qrcode/{existing_entry['short_code']}"
+    })
 
 
 @router.post("/shorten")
@@ -61,26 +61,16 @@ async def shorten_url(request: URLRequest):
         if not request.long_url:
             raise HTTPException(status_code=400, detail="Long URL is required")
     
-        # Check if the long URL is already shortened
-        existing_entry = collection.find_one({"long_url": str(request.long_url)})
+        # Check if the long URL (or an equivalent spelling of it) is already shortened
+        long_url_hash = url_digest(str(request.long_url))
+        existing_entry = await repository.lookup_by_url_hash(long_url_hash)
         if existing_entry:
-            short_url = f"{BASE_URL}/{existing_entry['short_code']}"
-            return JSONResponse(content={
-                "message": "This URL has already been shortened.",
-                "already_shortened": True,
-                "shortened_url": short_url,
-                "edit_link": f"{FRONTEND_URL}/edit/{existing_entry['edit_id']}",
-                "qr_code": existing_entry["qr_code"]
-            })
+            return already_shortened_response(existing_entry)
     
-        # Generate short code
-        short_code = request.custom_alias if request.custom_alias else shortuuid.uuid()[:6]
-        logger.info(f"Generated short_code: {short_code}")  # Debug log
-
         if request.custom_alias:
             # Ensure custom_alias is a string
             short_code = str(request.custom_alias)
-            if collection.find_one({"short_code": short_code}):
+            if await repository.short_code_exists(short_code):
                 logger.error(f"Custom alias '{short_code}' is already in use.")  # Log custom alias error
                 raise HTTPException(status_code=400, detail=f"Custom alias '{short_code}' is already in use. Please try a different alias.")
 
@@ -112,31 +102,49 @@ async def shorten_url(request: URLRequest):
             if expiration_date < datetime.now(timezone.utc):
                 raise HTTPException(status_code=400, detail="Expiration date cannot be in the past.")
 
-        edit_id = shortuuid.uuid()[:10]
+        # Insert URL and related data into MongoDB (store expiration date as datetime),
+        # retrying with fresh codes if a generated one collides with the unique index
+        for attempt in range(MAX_CODE_ATTEMPTS):
+            if not request.custom_alias:
+                short_code = await code_generator.next_code()
+                logger.info(f"Generated short_code: {short_code}")  # Debug log
+            edit_id = new_edit_id()
+
+            try:
+                await repository.insert_url({
+                    "short_code": short_code,
+                    "long_url": str(request.long_url),
+                    "long_url_hash": long_url_hash,
+                    "expiration_date": expiration_date if expiration_date else None,  # Store as datetime
+                    "edit_id": edit_id
+                }, checked=bool(request.custom_alias) or code_generator.unique)
+                break
+            except DuplicateKeyError as e:
+                key_pattern = (e.details or {}).get("keyPattern", {})
+                if "long_url_hash" in key_pattern:
+                    # A concurrent request shortened the same URL first
+                    existing_entry = await repository.lookup_by_url_hash(long_url_hash)
+                    if existing_entry:
+                        return already_shortened_response(existing_entry)
+                if request.custom_alias and "short_code" in key_pattern:
+                    raise HTTPException(status_code=400, detail=f"Custom alias '{short_code}' is already in use. Please try a different alias.")
+                logger.warning(f"Duplicate key on attempt {attempt + 1}, retrying: {e}")
+            except Exception as e:
+                logger.error(f"Error saving to database: {e}")
+                raise HTTPException(status_code=500, detail=f"Error saving data to database: {str(e)}")
+        else:
+            logger.error(f"Could not allocate a unique short code after {MAX_CODE_ATTEMPTS} attempts")
+            raise HTTPException(status_code=500, detail="Could not allocate a unique short code")
+
         short_url = f"{BASE_URL}/{short_code}"
 
-        try:
-            qr_code = generate_qr_code(short_url)
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Error generating QR code: {e}")
-
-        # Insert URL and related data into MongoDB (store expiration date as datetime)
-        try:
-            collection.insert_one({
-                "short_code": short_code,
-                "long_url": str(request.long_url),
-                "expiration_date": expiration_date if expiration_date else None,  # Store as datetime
-                "edit_id": edit_id,
-                "qr_code": qr_code
-            })
-        except Exception as e:
-            logger.error(f"Error saving to database: {e}")
-            raise HTTPException(status_code=500, detail=f"Error saving data to database: {str(e)}")
+        # The code may have been negatively cached by an earlier redirect attempt
+        await link_cache.invalidate(short_code)
 
         return JSONResponse(content={
             "shortened_url": short_url,
             "edit_link": f"{FRONTEND_URL}/edit/{edit_id}",
-            "qr_code": qr_code
+            "qr_code_url": f"{BASE_URL}/qrcode/{short_code}"
         })
     
     except HTTPException as e:
@@ -148,18 +156,40 @@ async def shorten_url(request: URLRequest):
         raise HTTPException(status_code=500, detail=f"Server error: {e}")
 
 @router.get("/qrcode/{short_code}")
-async def get_qr_code(short_code: str):
-    """Retrieve QR code from MongoDB (base64 format)."""
-    data = collection.find_one({"short_code": short_code})
+async def get_qr_code(request: Request, short_code: str, fg: str = "000000", bg: str = "ffffff", size: int = QR_BOX_SIZE,
+                      format: str = "png", ec: str = QR_ERROR_CORRECTION):
+    """Render the QR code for a short URL on demand (PNG or SVG)."""
+    if format not in MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="Format must be 'png' or 'svg'")
+    if not 1 <= size <= 40:
+        raise HTTPException(status_code=400, detail="Size must be between 1 and 40")
+    ec = ec.upper()
+    if ec not in ERROR_CORRECTION_LEVELS:
+        raise HTTPException(status_code=400, detail="Error correction must be one of L, M, Q, H")
+    try:
+        fill_color = normalize_color(fg)
+        back_color = normalize_color(bg)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    link = await link_cache.get(short_code, repository.resolve)
     
-    if not data:
+    if link is NOT_FOUND:
         raise HTTPException(status_code=404, detail="Short URL not found")
 
     # Check expiration if date is provided
-    if data.get("expiration_date"):
-        expiration_date = data["expiration_date"]
-        if datetime.utcnow() > expiration_date:
+    expiration_date = link[1]
+    if expiration_date:
+        if datetime.now(timezone.utc) > expiration_date:
             raise HTTPException(status_code=400, detail="This URL has expired")
 
-    qr_code_base64 = data["qr_code"]
-    return JSONResponse(content={"qr_code": qr_code_base64})
+    try:
+        body, etag = await get_qr_image(f"{BASE_URL}/{short_code}", fill_color, back_color, size, format, ec)
+    except QRRenderBusy:
+        raise HTTPException(status_code=503, detail="QR renderer is busy, retry shortly", headers={"Retry-After": "1"})
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=86400"}
+
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    return Response(content=body, media_type=MEDIA_TYPES[format], headers=headers)
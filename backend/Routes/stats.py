@@ -0,0 +1,47 @@
+from fastapi import APIRouter, HTTPException
+from analytics import get_rollups, ANALYTICS_ENABLED
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# Default window returned for each granularity when no range is given
+DEFAULT_WINDOWS = {
+    "minute": timedelta(hours=1),
+    "hour": timedelta(days=2),
+    "day": timedelta(days=30),
+}
+
+
+@router.get("/stats/{short_code}")
+async def get_click_stats(short_code: str, granularity: str = "hour", since: Optional[datetime] = None, until: Optional[datetime] = None):
+    """Return pre-aggregated click counts for a short code."""
+    # Rollups only exist with click analytics (which needs MongoDB)
+    if not ANALYTICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Click analytics are disabled")
+    if granularity not in DEFAULT_WINDOWS:
+        raise HTTPException(status_code=400, detail="Granularity must be 'minute', 'hour' or 'day'")
+
+    until = until or datetime.now(timezone.utc)
+    since = since or until - DEFAULT_WINDOWS[granularity]
+    if until.tzinfo is None:
+        until = until.replace(tzinfo=timezone.utc)
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+
+    buckets = await get_rollups(short_code, granularity, since, until)
+    for bucket in buckets:
+        bucket["bucket"] = bucket["bucket"].isoformat()
+
+    return {
+        "short_code": short_code,
+        "granularity": granularity,
+        "since": since.isoformat(),
+        "until": until.isoformat(),
+        "total": sum(bucket.get("total", 0) for bucket in buckets),
+        "buckets": buckets,
+    }
@@ -0,0 +1,235 @@
+import asyncio
+from collections import OrderedDict
+import hashlib
+import math
+import time
+import logging
+
+from starlette.requests import Request
+
+from config import settings
+from metrics import Counter, Gauge
+from responses import ERROR_BODIES, error_headers
+
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_ENABLED = settings.rate_limit_enabled
+PROXY_HOPS = settings.rate_limit_proxy_hops
+
+ADMISSION_REJECTED = Counter("sink_admission_rejected_total", "Write requests refused before reaching a route.", ("reason",))
+
+def client_ip(request: Request) -> str:
+    """The client's IP address, taken PROXY_HOPS entries from the end of X-Forwarded-For.
+
+    Entries further left are whatever the client sent, so a client cannot pick
+    its own address. Used for rate limits and for click analytics.
+    """
+    forwarded_for = request.headers.get("x-forwarded-for")
+    if PROXY_HOPS and forwarded_for:
+        hops = [hop.strip() for hop in forwarded_for.split(",")]
+        return hops[-min(PROXY_HOPS, len(hops))]
+    return request.client.host if request.client else "unknown"
+
+
+def write_cost(method: str, path: str):
+    """Tokens a request costs, or None if it is not a rate-limited write."""
+    if method == "POST" and path == "/shorten":
+        return 1
+    if method == "POST" and path == "/shorten/bulk":
+        return settings.rate_limit_bulk_cost
+    if method == "PUT" and path.startswith("/edit/"):
+        return 1
+    return None
+
+
+class MemoryBucketStore:
+    """Token buckets in a bounded LRU dict; the least recently seen clients are forgotten first.
+
+    A forgotten client simply starts again with a full bucket.
+    """
+
+    def __init__(self, max_clients: int = 100000):
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()
+
+    async def take(self, key: str, rate: float, burst: float, cost: float) -> float:
+        """Spend `cost` tokens; return 0 if allowed, else seconds until they will be available."""
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (burst, now))
+        tokens = min(burst, tokens + (now - updated) * rate)
+        retry_after = 0.0
+        if tokens >= cost:
+            tokens -= cost
+        else:
+            retry_after = (cost - tokens) / rate
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        if len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+        return retry_after
+
+
+# Refill, spend and store in one atomic step, on the Redis server's clock so every worker agrees
+TAKE_SCRIPT = """
+local rate, burst, cost = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or burst
+local updated = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+local retry_after = 0
+if tokens >= cost then
+    tokens = tokens - cost
+else
+    retry_after = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000))
+return tostring(retry_after)
+"""
+
+
+class RedisBucketStore:
+    """Token buckets shared by every worker through Redis.
+
+    If Redis fails, the limiter falls back to a local in-memory bucket for
+    that request rather than rejecting or waving everything through.
+    """
+
+    def __init__(self, redis_client, key_prefix: str = "sink:bucket:"):
+        self.key_prefix = key_prefix
+        self._take = redis_client.register_script(TAKE_SCRIPT)
+        self._fallback = MemoryBucketStore()
+
+    async def take(self, key: str, rate: float, burst: float, cost: float) -> float:
+        try:
+            return float(await self._take(keys=[self.key_prefix + key], args=[rate, burst, cost]))
+        except Exception as e:
+            logger.warning(f"Shared rate limit store failed, using local buckets: {e}")
+            return await self._fallback.take(key, rate, burst, cost)
+
+
+class RateLimiter:
+    """Per-client token buckets for write requests.
+
+    Clients are identified by a configured X-API-Key (with its own, larger
+    bucket) or else by client_ip().
+    """
+
+    def __init__(self, rate: float, burst: float, api_keys: str = "", api_key_rate: float = 20, api_key_burst: float = 200):
+        self.rate = rate
+        self.burst = burst
+        self.api_keys = {key.strip() for key in api_keys.split(",") if key.strip()}
+        self.api_key_rate = api_key_rate
+        self.api_key_burst = api_key_burst
+        self.store = MemoryBucketStore()
+
+    def use_redis(self, redis_client):
+        self.store = RedisBucketStore(redis_client)
+        logger.info("✅ Rate limits shared through Redis")
+
+    async def check(self, request: Request, cost: float) -> float:
+        """Spend tokens for one request; return 0 if allowed, else the Retry-After in seconds."""
+        api_key = request.headers.get("x-api-key")
+        if api_key in self.api_keys:
+            # Keys are secrets: only a digest goes into the store
+            key = "key:" + hashlib.blake2b(api_key.encode("utf-8"), digest_size=12).hexdigest()
+            return await self.store.take(key, self.api_key_rate, self.api_key_burst, cost)
+        return await self.store.take("ip:" + client_ip(request), self.rate, self.burst, cost)
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop wakes from a short sleep.
+
+    Sustained lag means the worker is saturated; writes are shed while it is
+    above the threshold so redirects keep their latency.
+    """
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.lag = 0.0
+        self._task = None
+
+    async def _run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            sample = time.perf_counter() - start - self.interval
+            self.lag = max(sample, self.lag * 0.7 + sample * 0.3)  # Rise at once, decay over a few samples
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.lag = 0.0
+
+
+rate_limiter = RateLimiter(
+    rate=settings.rate_limit_rate,
+    burst=settings.rate_limit_burst,
+    api_keys=settings.rate_limit_api_keys,
+    api_key_rate=settings.rate_limit_api_key_rate,
+    api_key_burst=settings.rate_limit_api_key_burst,
+)
+loop_lag = LoopLagMonitor()
+
+
+class AdmissionControl:
+    """ASGI middleware that decides whether a write request may run at all.
+
+    In order, a write is refused with a prebuilt response when the event loop
+    is lagging (503), when `max_concurrency` writes are already in flight
+    (503), or when the client's token bucket is empty (429). Every refusal
+    carries Retry-After. Redirects and other reads are never held back, so
+    under overload writes are shed first.
+    """
+
+    def __init__(self, app, max_concurrency: int = 32, shed_loop_lag: float = 0.1):
+        self.app = app
+        self.max_concurrency = max_concurrency
+        self.shed_loop_lag = shed_loop_lag
+        self.in_flight = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not RATE_LIMIT_ENABLED:
+            return await self.app(scope, receive, send)
+        cost = write_cost(scope["method"], scope["path"])
+        if cost is None:
+            return await self.app(scope, receive, send)
+
+        if self.shed_loop_lag and loop_lag.lag > self.shed_loop_lag:
+            return await self._reject(send, 503, 1, "overload")
+        if self.in_flight >= self.max_concurrency:
+            return await self._reject(send, 503, 1, "concurrency")
+
+        # Counted before the bucket check, which may wait on Redis
+        self.in_flight += 1
+        try:
+            retry_after = await rate_limiter.check(Request(scope), cost)
+            if retry_after:
+                return await self._reject(send, 429, retry_after, "rate_limit")
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
+
+    @staticmethod
+    async def _reject(send, status_code: int, retry_after: float, reason: str):
+        ADMISSION_REJECTED.inc(reason)
+        body = ERROR_BODIES[status_code]
+        await send({"type": "http.response.start", "status": status_code, "headers": [
+            *error_headers(body),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+        ]})
+        await send({"type": "http.response.body", "body": body})
+
+
+Gauge("sink_event_loop_lag_seconds", "Smoothed event loop wake-up lag; writes are shed above WRITE_SHED_LOOP_LAG.", lambda: loop_lag.lag)
@@ -0,0 +1,231 @@
+import asyncio
+from collections import Counter, deque
+from datetime import datetime, timedelta, timezone
+import time
+import logging
+from urllib.parse import urlparse
+
+from pymongo import UpdateOne
+
+from config import settings
+from database import clicks
+from metrics import DB_LATENCY
+
+
+logger = logging.getLogger(__name__)
+
+# Rollups live in MongoDB, so analytics default to off when MONGO_URI is not set
+ANALYTICS_ENABLED = settings.analytics_enabled
+
+if ANALYTICS_ENABLED and clicks is None:
+    logger.error("❌ ANALYTICS_ENABLED requires MONGO_URI")
+    raise ValueError("❌ ANALYTICS_ENABLED requires MONGO_URI")
+
+# Optional local GeoIP database (MaxMind GeoLite2-Country .mmdb)
+GEOIP_DB_PATH = settings.geoip_db_path
+
+# How long each rollup granularity is kept (None = forever)
+RETENTION = {
+    "minute": timedelta(days=2),
+    "hour": timedelta(days=90),
+    "day": None,
+}
+
+# Checked in order; the first matching token names the family
+UA_FAMILIES = [
+    ("bot", "Bot"), ("spider", "Bot"), ("crawl", "Bot"),
+    ("edg/", "Edge"), ("opr/", "Opera"), ("samsungbrowser", "Samsung Internet"),
+    ("chrome", "Chrome"), ("crios", "Chrome"), ("firefox", "Firefox"), ("fxios", "Firefox"),
+    ("safari", "Safari"), ("curl", "curl"), ("python", "Python"),
+]
+
+
+def ua_family(user_agent: str) -> str:
+    user_agent = user_agent.lower()
+    for token, family in UA_FAMILIES:
+        if token in user_agent:
+            return family
+    return "Other" if user_agent else "Unknown"
+
+
+def _field_key(value: str) -> str:
+    """Make a value safe to use as a MongoDB field name."""
+    return value.replace(".", "_").replace("$", "_") or "direct"
+
+
+def _truncate(timestamp: float) -> dict:
+    moment = datetime.fromtimestamp(timestamp, tz=timezone.utc)
+    return {
+        "minute": moment.replace(second=0, microsecond=0),
+        "hour": moment.replace(minute=0, second=0, microsecond=0),
+        "day": moment.replace(hour=0, minute=0, second=0, microsecond=0),
+    }
+
+
+class _CountryLookup:
+    """Country code from a local GeoIP file; 'unknown' if geoip2 or the file is unavailable."""
+
+    def __init__(self, path: str = None):
+        self._reader = None
+        if not path:
+            return
+        try:
+            import geoip2.database
+            self._reader = geoip2.database.Reader(path)
+        except Exception as e:
+            logger.warning(f"GeoIP lookups disabled: {e}")
+
+    def __call__(self, ip: str) -> str:
+        if self._reader is None or not ip:
+            return "unknown"
+        try:
+            return self._reader.country(ip).country.iso_code or "unknown"
+        except Exception:
+            return "unknown"
+
+
+class ClickRecorder:
+    """In-process ring buffer of redirect events flushed to per-minute/hour/day rollups.
+
+    record() only appends a tuple, so the redirect path never waits on the
+    database. If the buffer fills faster than it is flushed, the oldest events
+    are dropped rather than blocking redirects.
+    """
+
+    def __init__(self, capacity: int = 100_000, batch_size: int = 5000, flush_interval: float = 5):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._events = deque(maxlen=capacity)
+        self._country = _CountryLookup(GEOIP_DB_PATH)
+        self._task = None
+
+    def record(self, short_code: str, referrer: str, user_agent: str, ip: str):
+        self._events.append((short_code, time.time(), referrer, user_agent, ip))
+
+    async def flush(self) -> int:
+        """Write all buffered events as $inc upserts; returns how many were flushed."""
+        flushed = 0
+        while self._events:
+            batch = [self._events.popleft() for _ in range(min(self.batch_size, len(self._events)))]
+            try:
+                await self._write(batch)
+            except Exception:
+                self._events.extendleft(reversed(batch))  # Keep the events for the next flush
+                raise
+            flushed += len(batch)
+        return flushed
+
+    async def _write(self, batch: list):
+        counters = {}
+        for short_code, timestamp, referrer, user_agent, ip in batch:
+            fields = [
+                "total",
+                f"referrers.{_field_key(urlparse(referrer).hostname or '') if referrer else 'direct'}",
+                f"browsers.{_field_key(ua_family(user_agent))}",
+                f"countries.{_field_key(self._country(ip))}",
+            ]
+            for granularity, bucket in _truncate(timestamp).items():
+                counters.setdefault((short_code, granularity, bucket), Counter()).update(fields)
+
+        operations = []
+        for (short_code, granularity, bucket), increments in counters.items():
+            update = {"$inc": dict(increments)}
+            if RETENTION[granularity]:
+                update["$setOnInsert"] = {"expire_at": bucket + RETENTION[granularity]}
+            operations.append(UpdateOne(
+                {"short_code": short_code, "granularity": granularity, "bucket": bucket},
+                update,
+                upsert=True,
+            ))
+        with DB_LATENCY.time("mongo", "clicks_bulk_write"):
+            await clicks.bulk_write(operations, ordered=False)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Failed to flush click analytics: {e}")
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background task and flush whatever is still buffered."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+click_recorder = ClickRecorder(
+    capacity=settings.analytics_buffer_size,
+    batch_size=settings.analytics_batch_size,
+    flush_interval=settings.analytics_flush_interval,
+)
+
+
+async def get_rollups(short_code: str, granularity: str, since: datetime, until: datetime) -> list:
+    cursor = clicks.find(
+        {"short_code": short_code, "granularity": granularity, "bucket": {"$gte": since, "$lt": until}},
+        {"_id": 0, "short_code": 0, "granularity": 0, "expire_at": 0},
+    ).sort("bucket", 1)
+    return [doc async for doc in cursor]
+
+
+async def rollup_short_codes(after: str = "", limit: int = 1000) -> list:
+    """Distinct short codes that have rollups, in order, starting after `after`.
+
+    The leading $sort lets MongoDB answer the $group with a DISTINCT_SCAN of
+    the (short_code, granularity, bucket) index instead of reading rollups.
+    """
+    cursor = await clicks.aggregate([
+        {"$match": {"short_code": {"$gt": after}}},
+        {"$sort": {"short_code": 1}},
+        {"$group": {"_id": "$short_code"}},
+        {"$sort": {"_id": 1}},
+        {"$limit": limit},
+    ])
+    return [doc["_id"] async for doc in cursor]
+
+
+async def hot_short_codes(since: datetime, limit: int) -> list:
+    """[(short_code, clicks)] for the most clicked codes in hourly rollups since `since`, busiest first."""
+    with DB_LATENCY.time("mongo", "clicks_hot_short_codes"):
+        cursor = await clicks.aggregate([
+            {"$match": {"granularity": "hour", "bucket": {"$gte": since}}},
+            {"$group": {"_id": "$short_code", "clicks": {"$sum": "$total"}}},
+            {"$sort": {"clicks": -1, "_id": 1}},
+            {"$limit": limit},
+        ])
+        return [(doc["_id"], doc["clicks"]) async for doc in cursor]
+
+
+async def delete_rollups(short_codes: list) -> int:
+    with DB_LATENCY.time("mongo", "clicks_delete_many"):
+        result = await clicks.delete_many({"short_code": {"$in": short_codes}})
+    return result.deleted_count
+
+
+async def rename_rollups(old_short_code: str, new_short_code: str) -> int:
+    """Move a link's click history to its new code after an alias edit; returns rollups moved.
+
+    Rollups already under the new code belong to a deleted link that used it
+    before, and would collide with the unique index, so they are dropped first.
+    Failures are logged rather than raised: the edit itself has succeeded.
+    """
+    if not ANALYTICS_ENABLED or old_short_code == new_short_code:
+        return 0
+    try:
+        with DB_LATENCY.time("mongo", "clicks_rename"):
+            await clicks.delete_many({"short_code": new_short_code})
+            result = await clicks.update_many({"short_code": old_short_code}, {"$set": {"short_code": new_short_code}})
+        return result.modified_count
+    except Exception as e:
+        logger.error(f"Moving click rollups from '{old_short_code}' to '{new_short_code}' failed: {e}")
+        return 0
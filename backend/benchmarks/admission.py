@@ -0,0 +1,185 @@
+"""Load test: redirect latency while the write endpoints are flooded.
+
+Seeds an SQLite database in a temporary directory and, for each phase,
+starts uvicorn on it and measures redirects for --duration seconds:
+
+  redirects only          baseline
+  busy core               plus a process spinning on one core, sending nothing
+  flood, admission on     plus a POST /shorten flood from a separate process
+  flood, admission off    the same flood with RATE_LIMIT_ENABLED=0
+
+Flood requests come from --clients addresses (X-Forwarded-For), so both the
+per-client buckets and the global write limits are exercised. The server,
+the redirect clients and the flood are separate processes; give the machine
+a few cores for meaningful numbers. The busy core phase is the control for
+that: when the machine is short of cores, redirects slow down there as much
+as under the flood, and the difference between the two is what the server
+spends on writes. From the backend directory:
+
+    python -m benchmarks.admission --duration 10 --concurrency 20 --writers 200
+"""
+import argparse
+import asyncio
+from collections import Counter
+import itertools
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+# Seeding builds an SQLiteStorage directly; this only keeps config from demanding MONGO_URI
+os.environ.setdefault("STORAGE_BACKEND", "sqlite")
+
+import httpx  # noqa: E402
+
+from benchmarks.redirect_load import percentile  # noqa: E402
+from benchmarks.startup import BACKEND_DIR, free_port, offline_env  # noqa: E402
+
+
+async def redirects(base_url: str, codes: list, concurrency: int, duration: float) -> tuple:
+    """Closed-loop redirect clients; return (latencies, elapsed, errors)."""
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+
+        async def worker(rng):
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                response = await client.get(f"/{rng.choice(codes)}")
+                latencies.append(time.perf_counter() - start)
+                if response.status_code != 302:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(random.Random(i)) for i in range(concurrency)))
+        return latencies, time.perf_counter() - started, errors
+
+
+async def flood(base_url: str, writers: int, clients: int, duration: float) -> Counter:
+    """POST /shorten as fast as possible from `writers` connections; return status code counts."""
+    statuses = Counter()
+    deadline = time.perf_counter() + duration
+    serial = itertools.count()
+    limits = httpx.Limits(max_connections=writers)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+
+        async def writer(rng):
+            while time.perf_counter() < deadline:
+                n = rng.randrange(clients)
+                try:
+                    response = await client.post(
+                        "/shorten",
+                        json={"long_url": f"https://flood.example.com/{os.getpid()}/{next(serial)}"},
+                        headers={"x-forwarded-for": f"10.{n // 65536 % 256}.{n // 256 % 256}.{n % 256}"},
+                    )
+                    statuses[response.status_code] += 1
+                except httpx.HTTPError:
+                    statuses["error"] += 1
+
+        await asyncio.gather(*(writer(random.Random(i)) for i in range(writers)))
+    return statuses
+
+
+def seed(path: str, links: int) -> list:
+    from storage.sqlite import SQLiteStorage
+    from benchmarks.suite import documents, short_code
+
+    async def insert():
+        storage = SQLiteStorage(path)
+        await storage.connect()
+        try:
+            await storage.create_many(documents(0, links))
+        finally:
+            await storage.close()
+
+    asyncio.run(insert())
+    return [short_code(i) for i in range(links)]
+
+
+def start_server(env: dict, port: int, timeout: float = 60) -> subprocess.Popen:
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning", "--no-access-log"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/readyz", timeout=1) as response:
+                if response.status == 200:
+                    time.sleep(1)  # Let the short code filter finish its first build
+                    return server
+        except (urllib.error.URLError, ConnectionError):
+            pass
+        time.sleep(0.05)
+    server.terminate()
+    raise TimeoutError(f"server not ready after {timeout}s")
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        env = offline_env(tmpdir)
+        env["ANALYTICS_ENABLED"] = "0"
+        env["PYTHONWARNINGS"] = "ignore::UserWarning"  # The pydantic serializer warning, once per write
+        codes = seed(env["SQLITE_PATH"], args.links)
+
+        print(f"{'phase':<22} {'redirect/s':>10} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}   writes by status")
+        for label, load, enabled in (
+            ("redirects only", None, "1"),
+            ("busy core", "busy", "1"),
+            ("flood, admission on", "flood", "1"),
+            ("flood, admission off", "flood", "0"),
+        ):
+            port = free_port()
+            base_url = f"http://127.0.0.1:{port}"
+            server = start_server({**env, "RATE_LIMIT_ENABLED": enabled}, port)
+            loader = None
+            try:
+                if load == "busy":
+                    loader = subprocess.Popen([sys.executable, "-c", "while True: pass"])
+                elif load == "flood":
+                    loader = subprocess.Popen(
+                        [sys.executable, "-m", "benchmarks.admission", "--flood", base_url,
+                         "--writers", str(args.writers), "--clients", str(args.clients), "--duration", str(args.duration + 1)],
+                        cwd=BACKEND_DIR, env=env, stdout=subprocess.PIPE, text=True,
+                    )
+                if loader is not None:
+                    time.sleep(1)  # Measure redirects once the load is running
+                latencies, elapsed, errors = asyncio.run(redirects(base_url, codes, args.concurrency, args.duration))
+                writes = "-"
+                if load == "flood":
+                    statuses = json.loads(loader.communicate()[0])
+                    writes = ", ".join(f"{status}: {count}" for status, count in sorted(statuses.items()))
+            finally:
+                if loader is not None and loader.poll() is None:
+                    loader.kill()
+                    loader.wait()
+                server.terminate()
+                server.wait()
+
+            print(f"{label:<22} {len(latencies) / elapsed:>10,.0f} {percentile(latencies, 50) * 1000:>8.2f} "
+                  f"{percentile(latencies, 99) * 1000:>8.2f} {errors:>7}   {writes}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure redirect latency while the write endpoints are flooded.")
+    parser.add_argument("--duration", type=float, default=10, help="seconds measured per phase")
+    parser.add_argument("--concurrency", type=int, default=20, help="concurrent redirect clients")
+    parser.add_argument("--writers", type=int, default=200, help="concurrent flooding connections")
+    parser.add_argument("--clients", type=int, default=50, help="distinct flooding IP addresses")
+    parser.add_argument("--links", type=int, default=10000)
+    parser.add_argument("--flood", metavar="BASE_URL", help=argparse.SUPPRESS)  # Internal: run as the flood process
+    args = parser.parse_args()
+    if args.flood:
+        print(json.dumps(asyncio.run(flood(args.flood, args.writers, args.clients, args.duration))))
+    else:
+        main(args)
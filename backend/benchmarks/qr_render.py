@@ -0,0 +1,71 @@
+"""QR render throughput and event-loop lag, inline vs. the render pool.
+
+Fires concurrent renders of distinct URLs (so the image cache never hits)
+while a probe task measures how late the event loop wakes it up. Inline
+rendering is what the route did before renders moved to qr_render_pool.
+From the backend directory:
+
+    python -m benchmarks.qr_render --renders 500 --concurrency 32
+"""
+import argparse
+import asyncio
+import time
+
+import qr
+from qr import QRRenderPool, RENDERERS
+from benchmarks.redirect_load import percentile
+
+
+async def probe_lag(lags: list, stop: asyncio.Event, interval: float = 0.001):
+    """Record how much later than requested each short sleep returns."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+
+async def run(label: str, render, total: int, concurrency: int):
+    lags = []
+    stop = asyncio.Event()
+    probe = asyncio.create_task(probe_lag(lags, stop))
+    counter = iter(range(total))
+
+    async def worker():
+        for i in counter:
+            await render(f"https://sink.example/bench{i}")
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await probe
+
+    print(f"{label:<22} {total / elapsed:>8,.0f} renders/s   loop lag p99 {percentile(lags, 99) * 1000:>7.2f} ms   max {max(lags) * 1000:>7.2f} ms")
+
+
+async def main(total: int, concurrency: int, workers: int, fmt: str, ec: str):
+    args = ("#000000", "#ffffff", qr.QR_BOX_SIZE, ec)
+
+    async def inline(url):
+        RENDERERS[fmt](url, *args)
+
+    await run(f"inline {fmt}", inline, total, concurrency)
+
+    for kind in ("thread", "process"):
+        pool = QRRenderPool(workers=workers, max_pending=concurrency, kind=kind)
+        try:
+            await pool.render(fmt, "https://sink.example/warmup", *args)  # Start the workers outside the timing
+            await run(f"{kind} pool {fmt} x{workers}", lambda url: pool.render(fmt, url, *args), total, concurrency)
+        finally:
+            pool.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark QR rendering and its effect on the event loop.")
+    parser.add_argument("--renders", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=qr.qr_render_pool.workers)
+    parser.add_argument("--format", choices=sorted(RENDERERS), default="png")
+    parser.add_argument("--ec", choices=sorted(qr.ERROR_CORRECTION_LEVELS), default=qr.QR_ERROR_CORRECTION)
+    args = parser.parse_args()
+    asyncio.run(main(args.renders, args.concurrency, args.workers, args.format, args.ec))
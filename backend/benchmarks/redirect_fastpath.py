@@ -0,0 +1,71 @@
+"""Compare the ASGI redirect fast path with the FastAPI route.
+
+Runs the app in-process over httpx's ASGI transport with the redirect cache
+pre-seeded, so no database is needed and the numbers isolate framework
+overhead. From the backend directory:
+
+    python -m benchmarks.redirect_fastpath --requests 20000 --concurrency 50
+
+For end-to-end numbers against a running server, use benchmarks/redirect_load.py
+with REDIRECT_FAST_PATH=1 and =0.
+"""
+import argparse
+import asyncio
+import os
+import time
+
+# Offline defaults; no connection is opened because the lifespan never runs
+os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+os.environ.setdefault("BASE_URL", "http://localhost:8000")
+os.environ.setdefault("FRONTEND_URL", "http://localhost:5173")
+os.environ.setdefault("ANALYTICS_ENABLED", "0")
+
+import httpx  # noqa: E402
+
+from config import settings  # noqa: E402
+from cache import redirect_cache  # noqa: E402
+from main import app  # noqa: E402
+from benchmarks.redirect_load import percentile  # noqa: E402
+
+
+async def run(total: int, concurrency: int, codes: list):
+    latencies = []
+    counter = iter(range(total))
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def worker():
+            for i in counter:
+                start = time.perf_counter()
+                response = await client.get(f"/{codes[i % len(codes)]}")
+                latencies.append(time.perf_counter() - start)
+                assert response.status_code == 302, response.status_code
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return total / elapsed, percentile(latencies, 50), percentile(latencies, 99)
+
+
+async def main(total: int, concurrency: int, links: int):
+    codes = [f"bench{i}" for i in range(links)]
+    redirect_cache.max_size = max(redirect_cache.max_size, links)
+    redirect_cache.ttl = float("inf")
+    for code in codes:
+        redirect_cache.set(code, f"https://example.com/{code}")
+
+    for label, enabled in (("fastapi route", False), ("asgi fast path", True)):
+        settings.redirect_fast_path = enabled
+        rps, p50, p99 = await run(total, concurrency, codes)
+        print(f"{label:<15} {rps:>9,.0f} req/s   p50 {p50 * 1000:.2f} ms   p99 {p99 * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the redirect fast path against the FastAPI route.")
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--links", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency, args.links))
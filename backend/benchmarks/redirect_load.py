@@ -0,0 +1,70 @@
+"""Concurrent redirect load benchmark.
+
+Drives GET /{short_code} against a running backend at a fixed concurrency and
+reports throughput and latency percentiles. Run it once against the old build
+and once against the new one to compare:
+
+    uvicorn main:app --workers 1 &
+    python benchmarks/redirect_load.py --short-code abc123 --requests 5000 --concurrency 100
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run(base_url: str, short_codes: list, total: int, concurrency: int):
+    latencies = []
+    errors = 0
+    counter = iter(range(total))
+
+    async with httpx.AsyncClient(base_url=base_url, follow_redirects=False, timeout=30) as client:
+
+        async def worker():
+            nonlocal errors
+            for i in counter:
+                short_code = short_codes[i % len(short_codes)]
+                start = time.perf_counter()
+                try:
+                    response = await client.get(f"/{short_code}")
+                    if response.status_code >= 400:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return latencies, errors, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark concurrent redirect throughput.")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--short-code", action="append", required=True, help="Short code to hit (repeatable)")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    args = parser.parse_args()
+
+    latencies, errors, elapsed = asyncio.run(run(args.base_url, args.short_code, args.requests, args.concurrency))
+
+    print(f"requests:    {len(latencies)} ({errors} errors)")
+    print(f"concurrency: {args.concurrency}")
+    print(f"throughput:  {len(latencies) / elapsed:.1f} req/s")
+    print(f"mean:        {statistics.mean(latencies) * 1000:.2f} ms")
+    for pct in (50, 95, 99):
+        print(f"p{pct}:         {percentile(latencies, pct) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Cold-start cost: import time of main and time until the first request is served.
+
+Runs `python -X importtime -c "import main"` and lists the most expensive
+modules, then starts uvicorn and polls GET /readyz until it answers 200.
+Uses the SQLite backend in a temporary directory so no database is needed.
+From the backend directory:
+
+    python -m benchmarks.startup --runs 5
+"""
+import argparse
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def offline_env(tmpdir: str) -> dict:
+    env = dict(os.environ)
+    env.setdefault("STORAGE_BACKEND", "sqlite")
+    env.setdefault("SQLITE_PATH", os.path.join(tmpdir, "links.db"))
+    env.setdefault("BASE_URL", "http://localhost:8000")
+    env.setdefault("FRONTEND_URL", "http://localhost:5173")
+    env.setdefault("LIFECYCLE_ENABLED", "0")
+    return env
+
+
+def import_times(env: dict) -> list:
+    """Return [(cumulative_us, self_us, depth, module)] for `import main`."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append((int(cumulative_us), int(self_us), len(indent) // 2, module))
+    return rows
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_to_first_request(env: dict, timeout: float = 60) -> float:
+    """Seconds from spawning uvicorn until GET /readyz returns 200."""
+    port = free_port()
+    url = f"http://127.0.0.1:{port}/readyz"
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started
+            except (urllib.error.URLError, ConnectionError):
+                pass
+            time.sleep(0.01)
+        raise TimeoutError(f"server not ready after {timeout}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main(runs: int, top: int):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        env = offline_env(tmpdir)
+
+        totals = []
+        for _ in range(runs):
+            rows = import_times(env)
+            totals.append(next(cumulative for cumulative, _, depth, module in rows if module == "main" and depth == 0))
+        print(f"import main: median {statistics.median(totals) / 1000:.1f} ms over {runs} runs")
+
+        print("\nslowest top-level imports (last run, cumulative):")
+        top_level = sorted((row for row in rows if row[2] == 1), reverse=True)[:top]
+        for cumulative, self_us, _, module in top_level:
+            print(f"  {cumulative / 1000:>8.1f} ms  {module}")
+
+        ready = [time_to_first_request(env) for _ in range(runs)]
+        print(f"\nspawn -> first 200 from /readyz: median {statistics.median(ready) * 1000:.0f} ms, "
+              f"min {min(ready) * 1000:.0f} ms, max {max(ready) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure import time and time to first request.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+    main(args.runs, args.top)
@@ -0,0 +1,97 @@
+"""Compare storage backends on the redirect read path and on inserts.
+
+Seeds N links, then times storage.resolve() for random codes (the cache-miss
+redirect path) and storage.create() for new links. SQLite runs against a
+temporary file; MongoDB runs against MONGO_URI when it is set, using
+throwaway codes that are removed afterwards. From the backend directory:
+
+    python -m benchmarks.storage --links 100000 --lookups 50000
+"""
+import argparse
+import asyncio
+import os
+import random
+import secrets
+import tempfile
+import time
+
+# Backends are built explicitly below; this only keeps config from demanding MONGO_URI
+os.environ.setdefault("STORAGE_BACKEND", "sqlite")
+
+import database  # noqa: E402
+from canonical import url_digest  # noqa: E402
+from storage.sqlite import SQLiteStorage  # noqa: E402
+from benchmarks.redirect_load import percentile  # noqa: E402
+
+
+def documents(prefix: str, start: int, count: int) -> list:
+    return [
+        {
+            "short_code": f"{prefix}{i}",
+            "long_url": f"https://example.com/{prefix}/{i}",
+            "long_url_hash": url_digest(f"https://example.com/{prefix}/{i}"),
+            "expiration_date": None,
+            "edit_id": f"{prefix}e{i}",
+        }
+        for i in range(start, start + count)
+    ]
+
+
+async def timed(calls) -> list:
+    latencies = []
+    for call in calls:
+        start = time.perf_counter()
+        await call()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def report(label: str, latencies: list):
+    rate = len(latencies) / sum(latencies)
+    print(f"  {label:<8} {rate:>10,.0f} ops/s   p50 {percentile(latencies, 50) * 1e6:>8.1f} µs   p99 {percentile(latencies, 99) * 1e6:>8.1f} µs")
+
+
+async def bench(name: str, storage, links: int, lookups: int, inserts: int):
+    prefix = f"b{secrets.token_hex(3)}"
+    for start in range(0, links, 1000):
+        await storage.create_many(documents(prefix, start, min(1000, links - start)))
+
+    codes = [f"{prefix}{random.randrange(links)}" for _ in range(lookups)]
+    resolve = await timed(lambda code=code: storage.resolve(code) for code in codes)
+    create = await timed(lambda document=document: storage.create(document) for document in documents(prefix, links, inserts))
+
+    print(f"{name} ({links:,} links)")
+    report("resolve", resolve)
+    report("create", create)
+    return prefix
+
+
+async def main(links: int, lookups: int, inserts: int):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        storage = SQLiteStorage(os.path.join(tmpdir, "bench.db"))
+        await storage.connect()
+        try:
+            await bench("sqlite", storage, links, lookups, inserts)
+        finally:
+            await storage.close()
+
+    if database.client is None:
+        print("mongo    skipped (MONGO_URI not set)")
+        return
+
+    from storage.mongo import MongoStorage
+    await database.connect()
+    try:
+        prefix = await bench("mongo", MongoStorage(), links, lookups, inserts)
+        await database.collection.delete_many({"short_code": {"$regex": f"^{prefix}"}})
+    finally:
+        await database.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark storage backends.")
+    parser.add_argument("--links", type=int, default=100000)
+    parser.add_argument("--lookups", type=int, default=50000)
+    parser.add_argument("--inserts", type=int, default=5000)
+    args = parser.parse_args()
+    asyncio.run(main(args.links, args.lookups, args.inserts))
@@ -0,0 +1,284 @@
+"""Reproducible end-to-end benchmark: seeded data, mixed workload, JSON results.
+
+Seeds N synthetic links straight into storage, then drives a weighted mix of
+redirect, probe (unknown code), shorten and edit requests through the ASGI app (in-process, with
+the real lifespan) at a fixed concurrency and reports req/s and p50/p95/p99
+per route. Codes, URLs and the request sequence all come from --seed, so two
+runs with the same arguments send identical traffic.
+
+The default backend is an SQLite file in a temporary directory, which needs
+no services and suits quick micro-runs. With --backend mongo the run uses
+MONGO_URI (a local mongod) and the MONGO_DATABASE database, "sink_bench"
+unless set, which is dropped first unless --reuse is given. From the backend
+directory:
+
+    python -m benchmarks.suite --links 1000000 --requests 50000 --concurrency 64
+    python -m benchmarks.suite --backend mongo --links 5000000 --reuse
+    python -m benchmarks.suite --compare benchmarks/results/a.json benchmarks/results/b.json
+
+Each run writes benchmarks/results/<commit>-<backend>-<timestamp>.json
+(or --out) with the commit, arguments and per-route numbers.
+"""
+import argparse
+import asyncio
+from datetime import datetime, timedelta, timezone
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(BACKEND_DIR, "benchmarks", "results")
+
+ROUTES = ("redirect", "probe", "shorten", "edit")
+EXPECTED_STATUS = {"redirect": 302, "probe": 404, "shorten": 200, "edit": 200}
+
+
+def parse_mix(value: str) -> dict:
+    """Parse "redirect=90,shorten=5,edit=5" into {route: weight}."""
+    mix = {}
+    for part in value.split(","):
+        route, _, weight = part.partition("=")
+        if route.strip() not in ROUTES:
+            raise argparse.ArgumentTypeError(f"unknown route {route!r}, expected one of {', '.join(ROUTES)}")
+        mix[route.strip()] = float(weight)
+    return mix
+
+
+def git_commit() -> tuple:
+    """(commit hash, dirty) of the working tree, or ("unknown", False) outside git."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True).stdout.strip()
+        status = subprocess.run(["git", "status", "--porcelain", "--", "."], cwd=BACKEND_DIR, capture_output=True, text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+    return commit, bool(status.strip())
+
+
+def short_code(i: int) -> str:
+    """Short code of seeded link `i`; the workload derives codes instead of storing them."""
+    from codegen import base62_encode
+
+    return "s" + base62_encode(i, 5)
+
+
+def documents(start: int, count: int) -> list:
+    from canonical import url_digest
+
+    docs = []
+    for i in range(start, start + count):
+        long_url = f"https://example.com/seed/{i}"
+        docs.append({
+            "short_code": short_code(i),
+            "long_url": long_url,
+            "long_url_hash": url_digest(long_url),
+            "expiration_date": None,
+            "edit_id": "e" + short_code(i)[1:],
+        })
+    return docs
+
+
+async def seed(storage, links: int, batch_size: int, reuse: bool):
+    existing = await storage.estimated_count()
+    if reuse and existing >= links:
+        print(f"seed:        reusing {existing:,} existing links")
+        return
+    started = time.perf_counter()
+    for start in range(0, links, batch_size):
+        errors = await storage.create_many(documents(start, min(batch_size, links - start)))
+        if errors and not reuse:
+            raise RuntimeError(f"seeding failed at {start}: {errors[0]['errmsg']}")
+    elapsed = time.perf_counter() - started
+    print(f"seed:        {links:,} links in {elapsed:.1f}s ({links / elapsed:,.0f} docs/s)")
+
+
+def plan(args) -> list:
+    """The request sequence: [(route, index)], identical for identical arguments."""
+    rng = random.Random(args.seed)
+    routes = list(args.mix)
+    weights = [args.mix[route] for route in routes]
+    sequence = []
+    for i in range(args.warmup + args.requests):
+        route = rng.choices(routes, weights)[0]
+        if route in ("shorten", "probe"):
+            sequence.append((route, i))
+        else:
+            # Skewed towards low indexes: a few hot links take most of the traffic
+            sequence.append((route, int(args.links * rng.random() ** args.skew)))
+    return sequence
+
+
+def summarize(latencies: list, errors: int, elapsed: float) -> dict:
+    from benchmarks.redirect_load import percentile
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+async def drive(app, args, sequence: list) -> dict:
+    import httpx
+
+    run_id = f"{args.seed}-{int(time.time())}"
+    future = (datetime.now(timezone.utc) + timedelta(days=365)).isoformat()
+
+    async def send(client, route: str, i: int):
+        if route == "redirect":
+            return await client.get(f"/{short_code(i)}")
+        if route == "probe":
+            # Scanner traffic: codes that were never issued
+            return await client.get(f"/p{run_id}x{i}")
+        if route == "shorten":
+            return await client.post("/shorten", json={"long_url": f"https://bench.example.com/{run_id}/{i}"})
+        return await client.put(f"/edit/e{short_code(i)[1:]}", json={"expiration_date": future})
+
+    latencies = {route: [] for route in args.mix}
+    errors = {route: 0 for route in args.mix}
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def worker(requests, record: bool):
+            for route, i in requests:
+                start = time.perf_counter()
+                # In-process SQLite requests never suspend, so without this one worker would run
+                # everything; yielding queues it behind the other clients as a busy server would
+                await asyncio.sleep(0)
+                response = await send(client, route, i)
+                if not record:
+                    continue
+                latencies[route].append(time.perf_counter() - start)
+                if response.status_code != EXPECTED_STATUS[route]:
+                    errors[route] += 1
+
+        warmup = iter(sequence[:args.warmup])
+        await asyncio.gather(*(worker(warmup, False) for _ in range(args.concurrency)))
+
+        measured = iter(sequence[args.warmup:])
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(measured, True) for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+    results = {route: summarize(latencies[route], errors[route], elapsed) for route in args.mix if latencies[route]}
+    results["total"] = summarize([x for samples in latencies.values() for x in samples], sum(errors.values()), elapsed)
+    return results
+
+
+def print_results(results: dict):
+    print(f"\n{'route':<10} {'requests':>9} {'errors':>7} {'req/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for route, row in results.items():
+        print(f"{route:<10} {row['requests']:>9,} {row['errors']:>7,} {row['rps']:>10,.1f} "
+              f"{row['p50_ms']:>9.2f} {row['p95_ms']:>9.2f} {row['p99_ms']:>9.2f}")
+
+
+def compare(before_path: str, after_path: str):
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+    print(f"before: {before['commit'][:12]} ({before['backend']}, {before['timestamp']})")
+    print(f"after:  {after['commit'][:12]} ({after['backend']}, {after['timestamp']})")
+    print(f"\n{'route':<10} {'metric':<7} {'before':>10} {'after':>10} {'change':>8}")
+    for route, row in after["results"].items():
+        old = before["results"].get(route)
+        if old is None:
+            continue
+        for metric in ("rps", "p50_ms", "p95_ms", "p99_ms"):
+            change = (row[metric] - old[metric]) / old[metric] * 100 if old[metric] else 0
+            print(f"{route:<10} {metric:<7} {old[metric]:>10,.2f} {row[metric]:>10,.2f} {change:>+7.1f}%")
+
+
+async def run(args):
+    # The app reads its configuration at import time, so import it only after the environment is set
+    from main import app, lifespan
+    from cache import redirect_cache
+    import database
+    from storage import storage
+    from bloom import short_code_filter, SHORT_CODE_FILTER_ENABLED
+
+    # Per-request log lines and URLRequest's serializer warning would otherwise be timed too
+    logging.getLogger().setLevel(logging.WARNING)
+    warnings.filterwarnings("ignore", message="Pydantic serializer warnings")
+    if args.cache_size is not None:
+        redirect_cache.max_size = args.cache_size
+
+    if args.backend == "mongo" and not args.reuse:
+        await database.client.drop_database(database.db.name)
+
+    async with lifespan(app):
+        await seed(storage, args.links, args.batch_size, args.reuse)
+        if SHORT_CODE_FILTER_ENABLED:
+            await short_code_filter.rebuild()  # Seeding bypasses the repository, so the filter has not seen these codes
+        sequence = plan(args)
+        return await drive(app, args, sequence)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed synthetic links and benchmark a mixed workload through the ASGI app.")
+    parser.add_argument("--backend", choices=("sqlite", "mongo"), default="sqlite")
+    parser.add_argument("--links", type=int, default=100000, help="synthetic links to seed")
+    parser.add_argument("--requests", type=int, default=20000, help="measured requests")
+    parser.add_argument("--warmup", type=int, default=2000, help="unmeasured requests sent first")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("redirect=90,shorten=5,edit=5"))
+    parser.add_argument("--skew", type=float, default=3.0, help="popularity skew; 1 is uniform, higher is hotter")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--batch-size", type=int, default=5000, help="seed insert batch size")
+    parser.add_argument("--cache-size", type=int, help="override REDIRECT_CACHE_SIZE (0 disables the L1 cache)")
+    parser.add_argument("--sqlite-path", help="keep the SQLite database here instead of a temporary file")
+    parser.add_argument("--reuse", action="store_true", help="keep previously seeded links instead of reseeding")
+    parser.add_argument("--out", help="results file (default: benchmarks/results/<commit>-<backend>-<timestamp>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="compare two results files and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        os.environ["STORAGE_BACKEND"] = args.backend
+        os.environ.setdefault("SQLITE_PATH", args.sqlite_path or os.path.join(tmpdir, "bench.db"))
+        os.environ.setdefault("MONGO_DATABASE", "sink_bench")
+        os.environ.setdefault("BASE_URL", "http://localhost:8000")
+        os.environ.setdefault("FRONTEND_URL", "http://localhost:5173")
+        os.environ.setdefault("ANALYTICS_ENABLED", "0")
+        os.environ.setdefault("LIFECYCLE_ENABLED", "0")
+        os.environ.setdefault("RATE_LIMIT_ENABLED", "0")  # One benchmark client would only measure 429s
+        sys.path.insert(0, BACKEND_DIR)
+
+        results = asyncio.run(run(args))
+
+    print(f"\nbackend {args.backend}, {args.links:,} links, concurrency {args.concurrency}, seed {args.seed}")
+    print_results(results)
+
+    commit, dirty = git_commit()
+    timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    out = args.out or os.path.join(RESULTS_DIR, f"{commit[:12]}-{args.backend}-{timestamp}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump({
+            "commit": commit,
+            "dirty": dirty,
+            "timestamp": timestamp,
+            "backend": args.backend,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": {key: value for key, value in vars(args).items() if key not in ("out", "compare")},
+            "results": results,
+        }, f, indent=2)
+    print(f"\nresults written to {out}")
+
+
+if __name__ == "__main__":
+    main()
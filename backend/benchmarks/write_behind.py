@@ -0,0 +1,118 @@
+"""Create latency with and without the write-behind journal.
+
+Times repository.insert_url() for new links in four modes: a direct MongoDB
+insert, write-behind with a code that still needs its uniqueness read,
+write-behind with that read answered by the short code filter, and
+write-behind with a code known to be free (counter codes and checked
+aliases). MongoDB is simulated offline: every round trip sleeps --rtt
+milliseconds, so the journal's real fsync is measured against a fixed
+network cost. From the backend directory:
+
+    python -m benchmarks.write_behind --creates 2000 --rtt 30
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+# Backends are replaced below; this only keeps config from demanding MONGO_URI
+os.environ.setdefault("STORAGE_BACKEND", "sqlite")
+os.environ.setdefault("WRITE_BEHIND", "0")
+
+import repository  # noqa: E402
+import writebehind  # noqa: E402
+from bloom import BloomFilter, short_code_filter  # noqa: E402
+from canonical import url_digest  # noqa: E402
+from writebehind import WriteBehindJournal  # noqa: E402
+from benchmarks.redirect_load import percentile  # noqa: E402
+
+
+class RemoteStorage:
+    """The storage calls a create makes, each costing one simulated round trip."""
+
+    def __init__(self, rtt: float):
+        self.rtt = rtt
+        self.short_codes = set()
+
+    async def create(self, document: dict):
+        await asyncio.sleep(self.rtt)
+        self.short_codes.add(document["short_code"])
+
+    async def short_code_exists(self, short_code: str) -> bool:
+        await asyncio.sleep(self.rtt)
+        return short_code in self.short_codes
+
+
+class RemoteCollection:
+    """The collection call the journal's flusher makes, with the same round trip."""
+
+    def __init__(self, rtt: float):
+        self.rtt = rtt
+
+    async def insert_many(self, documents, ordered=True):
+        await asyncio.sleep(self.rtt)
+
+
+def document(prefix: str, i: int) -> dict:
+    long_url = f"https://example.com/{prefix}/{i}"
+    return {
+        "short_code": f"{prefix}{i}",
+        "long_url": long_url,
+        "long_url_hash": url_digest(long_url),
+        "expiration_date": None,
+        "edit_id": f"{prefix}e{i}",
+    }
+
+
+async def measure(prefix: str, creates: int, concurrency: int, checked: bool) -> list:
+    latencies = []
+    counter = iter(range(creates))
+
+    async def worker():
+        for i in counter:
+            start = time.perf_counter()
+            await repository.insert_url(document(prefix, i), checked=checked)
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies
+
+
+async def main(args):
+    rtt = args.rtt / 1000
+    repository.storage = RemoteStorage(rtt)
+    writebehind.collection = RemoteCollection(rtt)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        journal = WriteBehindJournal(os.path.join(tmpdir, "writebehind.db"))
+        await journal.start()
+        repository.write_behind = journal
+
+        print(f"{'mode':<34} {'creates/s':>10} {'p50 ms':>8} {'p99 ms':>8}")
+        for label, prefix, enabled, checked, filtered in (
+            ("direct insert", "d", False, False, False),
+            ("write-behind, read before journal", "r", True, False, False),
+            ("write-behind, filter rules out", "f", True, False, True),
+            ("write-behind, code known free", "c", True, True, False),
+        ):
+            repository.WRITE_BEHIND_ENABLED = enabled
+            short_code_filter.filter = BloomFilter(args.creates * 2) if filtered else None
+            start = time.perf_counter()
+            latencies = await measure(prefix, args.creates, args.concurrency, checked)
+            elapsed = time.perf_counter() - start
+            print(f"{label:<34} {len(latencies) / elapsed:>10,.0f} {percentile(latencies, 50) * 1000:>8.2f} "
+                  f"{percentile(latencies, 99) * 1000:>8.2f}")
+            await journal.flush()
+
+        short_code_filter.filter = None
+        await journal.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare create latency with and without write-behind.")
+    parser.add_argument("--creates", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--rtt", type=float, default=30, help="simulated MongoDB round trip in ms")
+    args = parser.parse_args()
+    asyncio.run(main(args))
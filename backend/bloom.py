@@ -0,0 +1,171 @@
+import asyncio
+import hashlib
+import math
+import time
+import logging
+
+from config import settings
+from metrics import Counter, Gauge, DB_LATENCY
+from storage import storage
+
+
+logger = logging.getLogger(__name__)
+
+SHORT_CODE_FILTER_ENABLED = settings.short_code_filter_enabled
+
+FILTER_LOOKUPS = Counter("sink_short_code_filter_lookups_total", "Short code filter checks: definite_miss, maybe, and false_positive (passed but not stored).", ("result",))
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter of strings: no false negatives, tunable false positives.
+
+    Sized for `capacity` items at `error_rate`; the k bit positions come from
+    one 16-byte BLAKE2b digest via double hashing. Items cannot be removed.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        self.size = max(64, math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+        self.bits_set = 0
+
+    def _hashes(self, item: str) -> tuple:
+        digest = int.from_bytes(hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest(), "little")
+        return digest & 0xFFFFFFFFFFFFFFFF, (digest >> 64) | 1
+
+    def add(self, item: str):
+        h1, h2 = self._hashes(item)
+        bits, size = self.bits, self.size
+        for i in range(self.hashes):
+            position = (h1 + i * h2) % size
+            mask = 1 << (position & 7)
+            if not bits[position >> 3] & mask:
+                bits[position >> 3] |= mask
+                self.bits_set += 1
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        h1, h2 = self._hashes(item)
+        bits, size = self.bits, self.size
+        for i in range(self.hashes):
+            position = (h1 + i * h2) % size
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False  # Most absent codes stop at the first or second probe
+        return True
+
+    def false_positive_rate(self) -> float:
+        """Current probability that an absent item tests positive, from the fraction of bits set."""
+        return (self.bits_set / self.size) ** self.hashes
+
+    @property
+    def memory_bytes(self) -> int:
+        return len(self.bits)
+
+
+class ShortCodeFilter:
+    """Bloom filter of every existing short code, used to answer definite misses in memory.
+
+    Built in the background at startup by paging through the short_code index
+    and rebuilt every `rebuild_interval` seconds, which also drops codes that
+    were deleted, expired or renamed. New and renamed codes are added as they
+    are written, and codes published by other workers' cache invalidations are
+    added too. Until the first build finishes every code "might exist", so
+    lookups fall through to the database as before.
+
+    Only safe in a single worker process: another worker's insert is not in
+    this filter until the next rebuild, so its code would answer 404 here.
+    Definite misses are never cached (see LinkCache.get) for the same reason.
+    """
+
+    def __init__(self, error_rate: float = 0.01, rebuild_interval: float = 3600, page_size: int = 2000, headroom: float = 2.0, min_capacity: int = 100000):
+        self.error_rate = error_rate
+        self.rebuild_interval = rebuild_interval
+        self.page_size = page_size
+        self.headroom = headroom  # Capacity per existing code, leaving room for inserts until the next rebuild
+        self.min_capacity = min_capacity
+        self.filter = None
+        self._building = None
+        self._task = None
+
+    def add(self, *short_codes: str):
+        for short_code in short_codes:
+            if not short_code:
+                continue
+            if self.filter is not None:
+                self.filter.add(short_code)
+            if self._building is not None:
+                self._building.add(short_code)
+
+    def might_exist(self, short_code: str) -> bool:
+        """False only if the code is certainly not stored."""
+        if self.filter is None:
+            return True
+        if short_code in self.filter:
+            FILTER_LOOKUPS.inc("maybe")
+            return True
+        FILTER_LOOKUPS.inc("definite_miss")
+        return False
+
+    def record_false_positive(self):
+        """Count a code the filter passed but the database did not have."""
+        if self.filter is not None:
+            FILTER_LOOKUPS.inc("false_positive")
+
+    async def rebuild(self):
+        start = time.perf_counter()
+        capacity = max(self.min_capacity, int(await storage.estimated_count() * self.headroom))
+        building = self._building = BloomFilter(capacity, self.error_rate)
+        try:
+            after = ""
+            while True:
+                with DB_LATENCY.time(settings.storage_backend, "short_codes_page"):
+                    page = await storage.short_codes_page(after, self.page_size)
+                if not page:
+                    break
+                for short_code in page:
+                    building.add(short_code)
+                after = page[-1]
+                await asyncio.sleep(0)  # SQLite pages never yield; let requests run between them
+        finally:
+            self._building = None
+        self.filter = building
+        logger.info(
+            f"Short code filter built: {building.count} codes, {building.memory_bytes / 1024 / 1024:.1f} MiB, "
+            f"est. false positive rate {building.false_positive_rate():.4f} in {time.perf_counter() - start:.2f}s"
+        )
+
+    async def _run(self):
+        while True:
+            try:
+                await self.rebuild()
+            except Exception as e:
+                logger.error(f"Short code filter rebuild failed: {e}")
+            await asyncio.sleep(self.rebuild_interval)
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+short_code_filter = ShortCodeFilter(
+    error_rate=settings.short_code_filter_error_rate,
+    rebuild_interval=settings.short_code_filter_rebuild_interval,
+)
+
+Gauge("sink_short_code_filter_false_positive_rate", "Estimated false positive rate of the short code filter.",
+      lambda: short_code_filter.filter.false_positive_rate() if short_code_filter.filter else 0)
+Gauge("sink_short_code_filter_memory_bytes", "Bit array size of the short code filter.",
+      lambda: short_code_filter.filter.memory_bytes if short_code_filter.filter else 0)
+Gauge("sink_short_code_filter_items", "Short codes added to the filter since its last rebuild.",
+      lambda: short_code_filter.filter.count if short_code_filter.filter else 0)
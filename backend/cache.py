@@ -0,0 +1,287 @@
+import asyncio
+from collections import OrderedDict
+from datetime import datetime, timezone
+import json
+import time
+import logging
+
+from bloom import short_code_filter
+from config import settings
+from metrics import CACHE_LOOKUPS
+
+
+logger = logging.getLogger(__name__)
+
+
+# Sentinel stored for short codes that are known not to exist (negative caching)
+NOT_FOUND = object()
+
+
+class RedirectCache:
+    """Bounded LRU cache of short_code -> (long_url, expiration_date) with TTL."""
+
+    def __init__(self, max_size: int = 10000, ttl: float = 300, negative_ttl: float = 30):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries = OrderedDict()
+
+    def get(self, short_code: str):
+        """Return (long_url, expiration_date), NOT_FOUND, or None on a cache miss."""
+        entry = self._entries.get(short_code)
+        if entry is None:
+            return None
+
+        value, expires_at = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[short_code]
+            return None
+
+        self._entries.move_to_end(short_code)
+        return value
+
+    def ttl_for(self, expiration_date: datetime = None) -> float:
+        """Seconds a link may stay cached: the cache TTL, capped at the link's own expiry."""
+        if not expiration_date:
+            return self.ttl
+        return min(self.ttl, (expiration_date - datetime.now(timezone.utc)).total_seconds())
+
+    def set(self, short_code: str, long_url: str, expiration_date: datetime = None):
+        """Cache a resolved link; the TTL never outlives the link's own expiry."""
+        ttl = self.ttl_for(expiration_date)
+        if ttl <= 0:
+            return
+        self._store(short_code, (long_url, expiration_date), ttl)
+
+    def set_missing(self, short_code: str):
+        """Remember that a short code does not exist."""
+        self._store(short_code, NOT_FOUND, self.negative_ttl)
+
+    def invalidate(self, *short_codes: str):
+        for short_code in short_codes:
+            self._entries.pop(short_code, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _store(self, short_code, value, ttl):
+        self._entries[short_code] = (value, time.monotonic() + ttl)
+        self._entries.move_to_end(short_code)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+
+redirect_cache = RedirectCache(
+    max_size=settings.redirect_cache_size,
+    ttl=settings.redirect_cache_ttl,
+    negative_ttl=settings.redirect_cache_negative_ttl,
+)
+
+
+class LinkCache:
+    """Two-level link cache: in-process L1 backed by an optional shared Redis L2.
+
+    Lookups go L1 -> L2 -> loader (the database), and concurrent misses for the
+    same short code share one load, so a cold popular link costs one DB read.
+    Invalidations delete the L2 key and are published to every worker so each
+    drops its L1 copy, and a load already in flight for an invalidated code is
+    detached so its (possibly pre-edit) result is not cached. Redis errors are
+    logged and fall through to the loader.
+    """
+
+    def __init__(self, l1: RedirectCache, redis_url: str = None, channel: str = "sink:link-invalidations", key_prefix: str = "sink:link:"):
+        self.l1 = l1
+        self.redis_url = redis_url
+        self.channel = channel
+        self.key_prefix = key_prefix
+        self.redis = None
+        self._inflight = {}
+        self._listener = None
+
+    async def start(self, redis_client=None):
+        """Connect to Redis (or use the given client, e.g. fakeredis) and listen for invalidations."""
+        if redis_client is None and self.redis_url:
+            if self.redis_url.startswith("fakeredis://"):
+                from fakeredis import aioredis as redis_asyncio
+                redis_client = redis_asyncio.FakeRedis()
+            else:
+                import redis.asyncio as redis_asyncio
+                redis_client = redis_asyncio.from_url(self.redis_url)
+        if redis_client is None:
+            return
+
+        self.redis = redis_client
+        pubsub = await self._subscribe()
+        self._listener = asyncio.create_task(self._listen(pubsub))
+        logger.info("✅ Shared link cache connected")
+
+    async def stop(self):
+        if self._listener:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        if self.redis is not None:
+            await self.redis.aclose()
+            self.redis = None
+
+    async def _subscribe(self):
+        pubsub = self.redis.pubsub()
+        await pubsub.subscribe(self.channel)
+        return pubsub
+
+    async def _listen(self, pubsub, retry_delay: float = 1):
+        """Apply other workers' invalidations, resubscribing whenever the connection drops."""
+        while True:
+            try:
+                if pubsub is None:
+                    pubsub = await self._subscribe()
+                    # Invalidations published while disconnected were lost; forget everything they might cover
+                    self.l1.clear()
+                    logger.info("✅ Shared link cache resubscribed")
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        short_codes = json.loads(message["data"])
+                        self._drop_local(short_codes)
+                        short_code_filter.add(*short_codes)  # Codes inserted or renamed by another worker
+                raise ConnectionError("subscription closed")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Shared cache invalidation listener failed, resubscribing: {e}")
+                await asyncio.sleep(retry_delay)
+            finally:
+                if pubsub is not None:
+                    try:
+                        await pubsub.aclose()
+                    except Exception:
+                        pass
+                    pubsub = None
+
+    def _drop_local(self, short_codes):
+        """Forget codes in L1 and detach their in-flight loads, whose results may predate the change."""
+        self.l1.invalidate(*short_codes)
+        for short_code in short_codes:
+            self._inflight.pop(short_code, None)
+
+    async def get(self, short_code: str, loader):
+        """Return (long_url, expiration_date) or NOT_FOUND, loading at most once per code at a time."""
+        value = self.l1.get(short_code)
+        if value is not None:
+            CACHE_LOOKUPS.inc("link_l1", "hit")
+            return value
+        CACHE_LOOKUPS.inc("link_l1", "miss")
+
+        # A definite miss is answered but never cached: the filter may simply not
+        # have seen the code yet, and a cached NOT_FOUND would outlive that
+        if not short_code_filter.might_exist(short_code):
+            return NOT_FOUND
+
+        future = self._inflight.get(short_code)
+        if future is not None:
+            CACHE_LOOKUPS.inc("link_l1", "coalesced")
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[short_code] = future
+        try:
+            value = await self._load(short_code, loader, future)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved so an unawaited future doesn't warn
+            raise
+        finally:
+            if self._inflight.get(short_code) is future:
+                del self._inflight[short_code]
+
+    async def _load(self, short_code: str, loader, future):
+        def current() -> bool:
+            # False once the code was invalidated mid-load; the value is still answered, not cached
+            return self._inflight.get(short_code) is future
+
+        if self.redis is not None:
+            try:
+                raw = await self.redis.get(self.key_prefix + short_code)
+            except Exception as e:
+                logger.warning(f"Shared cache read failed: {e}")
+                raw = None
+            CACHE_LOOKUPS.inc("link_l2", "miss" if raw is None else "hit")
+            if raw is not None:
+                value = self._decode(raw)
+                if current():
+                    self._store_l1(short_code, value)
+                return value
+
+        url_data = await loader(short_code)
+        if not url_data:
+            short_code_filter.record_false_positive()
+        value = NOT_FOUND if not url_data else (url_data["long_url"], url_data.get("expiration_date"))
+        if current():
+            self._store_l1(short_code, value)
+            await self._store_l2(short_code, value)
+            if not current():
+                await self._delete_l2(short_code)  # Invalidated while the write was in flight
+        return value
+
+    def _store_l1(self, short_code: str, value):
+        if value is NOT_FOUND:
+            self.l1.set_missing(short_code)
+        else:
+            self.l1.set(short_code, *value)
+
+    async def _store_l2(self, short_code: str, value):
+        if self.redis is None:
+            return
+        ttl = self.l1.negative_ttl if value is NOT_FOUND else self.l1.ttl_for(value[1])
+        if ttl < 1:
+            return
+        try:
+            await self.redis.set(self.key_prefix + short_code, self._encode(value), ex=int(ttl))
+        except Exception as e:
+            logger.warning(f"Shared cache write failed: {e}")
+
+    async def _delete_l2(self, short_code: str):
+        try:
+            await self.redis.delete(self.key_prefix + short_code)
+        except Exception as e:
+            logger.warning(f"Shared cache delete failed: {e}")
+
+    @staticmethod
+    def _encode(value) -> str:
+        if value is NOT_FOUND:
+            return "null"
+        long_url, expiration_date = value
+        return json.dumps([long_url, expiration_date.isoformat() if expiration_date else None])
+
+    @staticmethod
+    def _decode(raw):
+        value = json.loads(raw)
+        if value is None:
+            return NOT_FOUND
+        long_url, expiration_date = value
+        return long_url, datetime.fromisoformat(expiration_date) if expiration_date else None
+
+    async def invalidate(self, *short_codes: str):
+        """Drop codes locally, from Redis, and from every other worker's L1."""
+        short_codes = [short_code for short_code in short_codes if short_code]
+        self._drop_local(short_codes)
+        if self.redis is None or not short_codes:
+            return
+        try:
+            await self.redis.delete(*(self.key_prefix + short_code for short_code in short_codes))
+            await self.redis.publish(self.channel, json.dumps(short_codes))
+        except Exception as e:
+            logger.error(f"Shared cache invalidation failed: {e}")
+
+
+link_cache = LinkCache(redirect_cache, redis_url=settings.redis_url)
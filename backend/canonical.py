@@ -0,0 +1,37 @@
+import hashlib
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def canonicalize_url(url: str) -> str:
+    """Normalize a URL so trivially different spellings of the same link compare equal.
+
+    Lowercases the scheme and host, drops default ports, strips a trailing
+    slash from non-root paths and sorts the query parameters. The fragment
+    is kept since single-page apps route on it.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").rstrip(".")
+
+    netloc = f"[{host}]" if ":" in host else host  # IPv6 literal
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        netloc = f"{netloc}:{parts.port}"
+    if parts.username:
+        userinfo = parts.username + (f":{parts.password}" if parts.password else "")
+        netloc = f"{userinfo}@{netloc}"
+
+    path = parts.path or "/"
+    if len(path) > 1:
+        path = path.rstrip("/") or "/"
+
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+
+    return urlunsplit((scheme, netloc, path, query, parts.fragment))
+
+
+def url_digest(url: str) -> bytes:
+    """16-byte BLAKE2b digest of the canonical URL, used as the dedupe key."""
+    return hashlib.blake2b(canonicalize_url(url).encode("utf-8"), digest_size=16).digest()
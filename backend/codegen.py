@@ -0,0 +1,123 @@
+import asyncio
+import secrets
+import string
+import time
+import logging
+
+from pymongo import ReturnDocument
+
+from config import settings
+from database import counters
+import repository
+
+
+logger = logging.getLogger(__name__)
+
+BASE62 = string.digits + string.ascii_letters
+
+# Odd and not a multiple of 31, so it is coprime with 62**n and multiplying by it
+# permutes the keyspace: consecutive counter values map to scattered codes.
+SCRAMBLE_MULTIPLIER = 3_961_479_817
+
+
+def base62_encode(number: int, length: int) -> str:
+    """Encode a non-negative integer as a zero-padded base62 string."""
+    chars = []
+    while number:
+        number, remainder = divmod(number, 62)
+        chars.append(BASE62[remainder])
+    return "".join(reversed(chars)).rjust(length, BASE62[0])
+
+
+def length_for_usage(count: int, min_length: int, max_load: float) -> int:
+    """Smallest code length whose keyspace keeps `count` codes under `max_load` occupancy."""
+    length = min_length
+    while count > max_load * 62 ** length:
+        length += 1
+    return length
+
+
+class RandomCodeGenerator:
+    """Random base62 codes whose length grows with keyspace usage.
+
+    Callers retry on DuplicateKeyError; with occupancy capped at `max_load`
+    each attempt collides with probability at most `max_load`.
+    """
+
+    unique = False
+
+    def __init__(self, min_length: int = 6, max_load: float = 0.001, refresh_seconds: float = 60):
+        self.min_length = min_length
+        self.max_load = max_load
+        self.refresh_seconds = refresh_seconds
+        self.length = min_length
+        self._refreshed_at = float("-inf")
+
+    async def next_code(self) -> str:
+        if time.monotonic() - self._refreshed_at > self.refresh_seconds:
+            self._refreshed_at = time.monotonic()
+            count = await repository.estimated_count()
+            self.length = length_for_usage(count, self.min_length, self.max_load)
+        return "".join(secrets.choice(BASE62) for _ in range(self.length))
+
+
+class CounterCodeGenerator:
+    """Codes from a global counter, leased from MongoDB in blocks.
+
+    Each worker reserves `block_size` values with one atomic $inc and then
+    hands out codes with no database round trip. Values are scrambled within
+    their length's keyspace so codes are not sequential, and the length grows
+    automatically once the counter exceeds 62**length.
+    """
+
+    unique = True  # No two leases overlap, so codes never repeat
+
+    def __init__(self, block_size: int = 1000, min_length: int = 6, counter_id: str = "short_code"):
+        if counters is None:
+            logger.error("❌ SHORT_CODE_GENERATOR=counter requires MONGO_URI")
+            raise ValueError("❌ SHORT_CODE_GENERATOR=counter requires MONGO_URI")
+        self.block_size = block_size
+        self.min_length = min_length
+        self.counter_id = counter_id
+        self._next = 0
+        self._end = 0
+        self._lock = asyncio.Lock()
+
+    async def next_code(self) -> str:
+        async with self._lock:
+            if self._next >= self._end:
+                await self._lease()
+            value = self._next
+            self._next += 1
+        return self.encode(value)
+
+    async def _lease(self):
+        doc = await counters.find_one_and_update(
+            {"_id": self.counter_id},
+            {"$inc": {"value": self.block_size}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        self._end = doc["value"]
+        self._next = self._end - self.block_size
+        logger.info(f"Leased short code block [{self._next}, {self._end})")
+
+    def encode(self, value: int) -> str:
+        length = self.min_length
+        while value >= 62 ** length:
+            length += 1
+        return base62_encode(value * SCRAMBLE_MULTIPLIER % 62 ** length, length)
+
+
+GENERATORS = {"random": RandomCodeGenerator, "counter": CounterCodeGenerator}
+
+code_generator = GENERATORS[settings.short_code_generator]()
+
+# How many fresh codes shorten_url tries before giving up on collisions
+MAX_CODE_ATTEMPTS = settings.max_code_attempts
+
+
+def new_edit_id() -> str:
+    """Random 10-character id for a link's private edit URL."""
+    import shortuuid  # Deferred: only link creation needs it, not startup
+    return shortuuid.uuid()[:10]
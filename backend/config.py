@@ -0,0 +1,148 @@
+import os
+from pathlib import Path
+from typing import Literal, Optional
+import logging
+
+from pydantic import ValidationError, field_validator, model_validator
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+logger = logging.getLogger(__name__)
+
+
+class Settings(BaseSettings):
+    """Every setting the backend reads, loaded once from the environment and backend/.env.
+
+    Field names match the environment variables case-insensitively
+    (base_url <- BASE_URL). Values can be reassigned at runtime, e.g. by
+    benchmarks toggling redirect_fast_path.
+    """
+
+    model_config = SettingsConfigDict(env_file=Path(__file__).with_name(".env"), extra="ignore")
+
+    # Public URLs; required by the routes that build links (checked there)
+    base_url: Optional[str] = None
+    frontend_url: Optional[str] = None
+
+    # Link storage: "mongo" needs MONGO_URI; "sqlite" is a local file
+    storage_backend: Literal["mongo", "sqlite"] = "mongo"
+    sqlite_path: str = "links.db"
+
+    # MongoDB connection pool sizing and timeouts (milliseconds)
+    mongo_uri: Optional[str] = None
+    mongo_database: str = "url_shortner"
+    mongo_max_pool_size: int = 100
+    mongo_min_pool_size: int = 0
+    mongo_server_selection_timeout_ms: int = 5000
+    mongo_connect_timeout_ms: int = 10000
+    mongo_socket_timeout_ms: int = 10000
+    mongo_wait_queue_timeout_ms: int = 5000
+
+    # Redirect path
+    redirect_fast_path: bool = True
+    redirect_log_sample_rate: float = 0.01
+    redirect_cache_size: int = 10000
+    redirect_cache_ttl: float = 300
+    redirect_cache_negative_ttl: float = 30
+    redis_url: Optional[str] = None
+    # Cache-Control on redirects: browsers revalidate (max-age), CDNs may serve for s-maxage seconds
+    redirect_max_age: int = 0
+    redirect_shared_max_age: int = 300
+
+    # Worker processes serving the app; uvicorn and gunicorn both read WEB_CONCURRENCY,
+    # so set the worker count here rather than with --workers
+    web_concurrency: int = 1
+
+    # In-memory Bloom filter of existing short codes; definite misses skip the database.
+    # Single process only: a worker's filter does not see other workers' inserts until it is rebuilt
+    short_code_filter_enabled: bool = False
+    short_code_filter_error_rate: float = 0.01
+    short_code_filter_rebuild_interval: float = 3600
+
+    # Short codes and inserts
+    short_code_generator: Literal["random", "counter"] = "random"
+    max_code_attempts: int = 5
+    bulk_batch_size: int = 500
+    bulk_max_item_size: int = 16384  # Characters per bulk item; longer ones end the request
+    # Single process only: the journal file is locked by the worker that opens it
+    write_behind: bool = False
+    write_behind_journal: str = "writebehind.db"
+    write_behind_batch_size: int = 500
+    write_behind_flush_interval: float = 0.2
+
+    # URL security checks; BLOCKLIST_PATHS is os.pathsep-separated
+    blocklist_paths: str = ""
+    blocklist_reload_interval: float = 30
+
+    # Click analytics; rollups live in MongoDB, so they default to on only when MONGO_URI is set
+    analytics_enabled: Optional[bool] = None
+    geoip_db_path: Optional[str] = None
+    analytics_buffer_size: int = 100000
+    analytics_batch_size: int = 5000
+    analytics_flush_interval: float = 5
+
+    # QR codes
+    qr_error_correction: Literal["L", "M", "Q", "H"] = "M"
+    qr_box_size: int = 10
+    qr_cache_size: int = 512
+    qr_render_workers: int = min(4, os.cpu_count() or 1)
+    qr_render_max_pending: int = 32
+    qr_render_pool: Literal["thread", "process"] = "thread"
+
+    # Background cleanup
+    lifecycle_enabled: bool = True
+    lifecycle_interval: float = 300
+    lifecycle_batch_size: int = 500
+    lifecycle_max_rows_per_second: float = 2000
+
+    # Admission control on write endpoints (POST /shorten, POST /shorten/bulk, PUT /edit/...).
+    # Token buckets per client IP, or per key for requests with a known X-API-Key
+    rate_limit_enabled: bool = True
+    rate_limit_rate: float = 2
+    rate_limit_burst: int = 20
+    rate_limit_bulk_cost: float = 10
+    rate_limit_store: Literal["memory", "redis"] = "memory"
+    rate_limit_api_keys: str = ""  # Comma-separated
+    rate_limit_api_key_rate: float = 20
+    rate_limit_api_key_burst: int = 200
+    # Proxies in front of the app; the client IP for rate limits and click analytics
+    # is that many entries from the end of X-Forwarded-For
+    rate_limit_proxy_hops: int = 1
+    # Global limits protecting redirects: concurrent writes, and event loop lag above which writes are shed
+    write_max_concurrency: int = 32
+    write_shed_loop_lag: float = 0.1
+
+    # Redirect map export for edge serving; the endpoints are disabled unless EXPORT_TOKEN is set
+    export_token: Optional[str] = None
+    export_page_size: int = 1000
+    export_delta_lag: float = 5
+
+    # Observability
+    metrics_enabled: bool = True
+    profiler_token: Optional[str] = None
+
+    @field_validator("qr_error_correction", mode="before")
+    @classmethod
+    def _upper(cls, value):
+        return value.upper() if isinstance(value, str) else value
+
+    @model_validator(mode="after")
+    def _check(self):
+        if self.storage_backend == "mongo" and not self.mongo_uri:
+            raise ValueError("❌ MONGO_URI not found in .env file")
+        if self.short_code_filter_enabled and self.web_concurrency > 1:
+            raise ValueError("❌ SHORT_CODE_FILTER_ENABLED needs a single worker (WEB_CONCURRENCY=1)")
+        if self.write_behind and self.web_concurrency > 1:
+            raise ValueError("❌ WRITE_BEHIND needs a single worker (WEB_CONCURRENCY=1); the journal is per process")
+        if self.rate_limit_store == "redis" and not self.redis_url:
+            raise ValueError("❌ RATE_LIMIT_STORE=redis requires REDIS_URL")
+        if self.analytics_enabled is None:
+            self.analytics_enabled = self.mongo_uri is not None
+        return self
+
+
+try:
+    settings = Settings()
+except ValidationError as e:
+    logger.error(f"❌ Invalid configuration: {e}")
+    raise
@@ -1,42 +1,91 @@
-from pymongo import MongoClient, ASCENDING
-import os
-from dotenv import load_dotenv
+from pymongo import AsyncMongoClient, ASCENDING
 from pymongo.errors import ConnectionFailure
 import logging
 
-# Load environment variables from .env file
-load_dotenv()
+from config import settings
 
 # Configure logger
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)  # Adjust log level as necessary
 
-# Fetch MongoDB URI from environment variables
-MONGO_URI = os.getenv("MONGO_URI")
-
-if not MONGO_URI:
-    logger.error("❌ MONGO_URI not found in .env file")
-    raise ValueError("❌ MONGO_URI not found in .env file")
-
-# Try to connect to MongoDB
-try:
-    # Initialize MongoDB client with timeout settings
-    client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000, connectTimeoutMS=10000)
-    
-    # Test the connection to MongoDB
-    client.admin.command("ping") 
-    
+client = db = collection = counters = clicks = None
+
+# MONGO_URI is only required by the mongo storage backend (checked in config.py)
+if settings.mongo_uri:
+    # Initialize the async MongoDB client; no I/O happens until the first operation
+    client = AsyncMongoClient(
+        settings.mongo_uri,
+        maxPoolSize=settings.mongo_max_pool_size,
+        minPoolSize=settings.mongo_min_pool_size,
+        serverSelectionTimeoutMS=settings.mongo_server_selection_timeout_ms,
+        connectTimeoutMS=settings.mongo_connect_timeout_ms,
+        socketTimeoutMS=settings.mongo_socket_timeout_ms,
+        waitQueueTimeoutMS=settings.mongo_wait_queue_timeout_ms,
+        tz_aware=True,  # Return stored datetimes as timezone-aware UTC
+    )
+
     # Get the database and collection
-    db = client.get_database("url_shortner")
+    db = client.get_database(settings.mongo_database)
     collection = db.get_collection("urls")
+    counters = db.get_collection("counters")  # Block-leased counters for short code generation
+    clicks = db.get_collection("clicks")  # Pre-aggregated click rollups per minute/hour/day
+
+
+async def ensure_indexes():
+    """Create the indexes backing every route query (no-op if they already exist)."""
+    # Redirects, QR codes and alias checks look up by short_code
+    await collection.create_index([("short_code", ASCENDING)], unique=True)
+
+    # Both edit endpoints look up by edit_id
+    await collection.create_index([("edit_id", ASCENDING)], unique=True)
+
+    # shorten_url dedupes on a 16-byte digest of the canonical URL. Partial so
+    # legacy documents without a digest (see scripts/backfill_url_hashes.py) are allowed.
+    await collection.create_index(
+        [("long_url_hash", ASCENDING)],
+        unique=True,
+        partialFilterExpression={"long_url_hash": {"$exists": True}},
+    )
+
+    # The redirect export's delta feed pages through changes in (updated_at, short_code) order.
+    # Partial so legacy documents without updated_at cost nothing; the full export covers them.
+    await collection.create_index(
+        [("updated_at", ASCENDING), ("short_code", ASCENDING)],
+        partialFilterExpression={"updated_at": {"$exists": True}},
+    )
+
+    # TTL index: MongoDB removes links in bulk once expiration_date has passed.
+    # Documents without an expiration_date (permanent links) are never touched.
+    await collection.create_index([("expiration_date", ASCENDING)], expireAfterSeconds=0)
+
+    # One rollup document per (short_code, granularity, bucket); minute/hour rollups age out
+    await clicks.create_index([("short_code", ASCENDING), ("granularity", ASCENDING), ("bucket", ASCENDING)], unique=True)
+    await clicks.create_index([("expire_at", ASCENDING)], expireAfterSeconds=0)
+
+
+async def connect():
+    """Check the MongoDB connection and create indexes. Called on app startup."""
+    if client is None:
+        return
+    try:
+        # Test the connection to MongoDB
+        await client.admin.command("ping")
+
+        await ensure_indexes()
+
+        logger.info("✅ Connected to MongoDB successfully!")
 
-    # Create index on short_code for uniqueness
-    collection.create_index([("short_code", ASCENDING)], unique=True)
+    except ConnectionFailure:
+        logger.error("❌ Failed to connect to MongoDB. Check if the server is running.")
+        raise
+    except Exception as e:
+        logger.error(f"❌ Failed to connect to MongoDB: {e}")
+        raise
 
-    logger.info("✅ Connected to MongoDB successfully!")
 
-except ConnectionFailure:
-    logger.error("❌ Failed to connect to MongoDB. Check if the server is running.")
-    raise
-except Exception as e:
-    logger.error(f"❌ Failed to connect to MongoDB: {e}")
\ No newline at end of file
+async def close():
+    """Close the MongoDB client and its connection pool. Called on app shutdown."""
+    if client is None:
+        return
+    await client.close()
+    logger.info("MongoDB connection closed.")
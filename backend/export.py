@@ -0,0 +1,141 @@
+from datetime import datetime, timedelta, timezone
+import hashlib
+import logging
+import re
+
+import analytics
+import repository
+from config import settings
+
+
+logger = logging.getLogger(__name__)
+
+# Required in the X-Export-Token header; the export endpoints are disabled when unset
+EXPORT_TOKEN = settings.export_token
+EXPORT_PAGE_SIZE = settings.export_page_size
+
+# The delta feed only returns changes at least this many seconds old, so writes
+# still in flight when a page is read cannot land behind the returned cursor
+EXPORT_DELTA_LAG = settings.export_delta_lag
+
+# Cloudflare Pages honours at most this many static rules in _redirects
+PAGES_REDIRECT_LIMIT = 2000
+
+# Codes that are literal in a _redirects rule; aliases are free text, and "*", ":name",
+# whitespace or "#" would turn a rule into a splat, a placeholder or a broken line
+PAGES_SAFE_CODE = re.compile(r"[A-Za-z0-9_-]+")
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def link_id(edit_id: str) -> str:
+    """Stable, non-secret id of a link that survives alias edits.
+
+    Consumers key their copy of the map by it, so when a delta entry arrives
+    with a new short code they know which old code to drop.
+    """
+    return hashlib.blake2b(edit_id.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def encode_cursor(updated_at: datetime, short_code: str = "") -> str:
+    """Format a delta feed cursor as <microseconds since epoch>:<short_code>.
+
+    Integer microseconds round-trip exactly, so no change at a page boundary is skipped.
+    """
+    return f"{(updated_at - EPOCH) // timedelta(microseconds=1)}:{short_code}"
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """Inverse of encode_cursor; raises ValueError("invalid cursor") on malformed input."""
+    micros, separator, short_code = cursor.partition(":")
+    try:
+        if not separator or int(micros) < 0:
+            raise ValueError
+        return EPOCH + timedelta(microseconds=int(micros)), short_code
+    except (ValueError, OverflowError):
+        raise ValueError("invalid cursor") from None
+
+
+def settled_until(now: datetime = None) -> datetime:
+    return (now or datetime.now(timezone.utc)) - timedelta(seconds=EXPORT_DELTA_LAG)
+
+
+def snapshot_cursor() -> str:
+    """Cursor to poll the delta feed from after taking a snapshot now; overlap is harmless."""
+    return encode_cursor(settled_until())
+
+
+def entry(doc: dict) -> dict:
+    """The exported shape of one link."""
+    expiration_date = doc.get("expiration_date")
+    return {
+        "short_code": doc["short_code"],
+        "long_url": doc["long_url"],
+        "expires_at": expiration_date.isoformat() if expiration_date else None,
+        "link": link_id(doc["edit_id"]),
+    }
+
+
+def pages_servable(doc: dict) -> bool:
+    """Whether a link can be a _redirects rule: permanent (rules have no expiry) and a literal code."""
+    return doc["expiration_date"] is None and PAGES_SAFE_CODE.fullmatch(doc["short_code"]) is not None
+
+
+def redirects_line(doc: dict) -> str:
+    """One Cloudflare Pages _redirects rule; only for links that pass pages_servable."""
+    return f"/{doc['short_code']} {doc['long_url']} 302\n"
+
+
+async def live_links(page_size: int = EXPORT_PAGE_SIZE):
+    """Yield every non-expired link in short_code order, one page in memory at a time."""
+    now = datetime.now(timezone.utc)
+    after = ""
+    while True:
+        page = await repository.live_links_page(after, now, page_size)
+        for doc in page:
+            yield doc
+        if len(page) < page_size:
+            return
+        after = page[-1]["short_code"]
+
+
+async def iterate(docs: list):
+    """An already fetched list, such as hot_links(), as an async iterator like live_links()."""
+    for doc in docs:
+        yield doc
+
+
+async def hot_links(limit: int, hours: float = 24) -> list:
+    """The `limit` most clicked live links over the last `hours`, busiest first.
+
+    Needs click analytics; raises ValueError when it is disabled.
+    """
+    if not analytics.ANALYTICS_ENABLED:
+        raise ValueError("Hot links need click analytics (ANALYTICS_ENABLED)")
+    now = datetime.now(timezone.utc)
+    ranked = await analytics.hot_short_codes(now - timedelta(hours=hours), limit)
+    found = await repository.resolve_many([short_code for short_code, _ in ranked])
+    links = []
+    for short_code, clicks in ranked:
+        doc = found.get(short_code)
+        if doc is None or (doc["expiration_date"] and doc["expiration_date"] <= now):
+            continue
+        links.append({"short_code": short_code, "clicks": clicks, **doc})
+    return links
+
+
+async def changes(cursor: str, limit: int = EXPORT_PAGE_SIZE) -> dict:
+    """Links created or edited after `cursor`, oldest first, and the cursor to continue from.
+
+    Expired links are included with their expires_at; consumers drop them.
+    An empty cursor starts from the beginning of the feed.
+    """
+    after = decode_cursor(cursor) if cursor else (EPOCH, "")
+    page = await repository.changed_links_page(after, settled_until(), limit)
+    if page:
+        cursor = encode_cursor(page[-1]["updated_at"], page[-1]["short_code"])
+    return {
+        "changes": [{**entry(doc), "updated_at": doc["updated_at"].isoformat()} for doc in page],
+        "cursor": cursor,
+        "has_more": len(page) == limit,
+    }
@@ -0,0 +1,62 @@
+from urllib.parse import quote
+
+from starlette.requests import Request
+
+from config import settings
+from responses import ERROR_BODIES, error_headers
+from Routes.redirect import resolve_redirect, record_click, sampled, logger
+
+# Same characters Starlette's RedirectResponse leaves unquoted in Location
+LOCATION_SAFE = ":/%#?=@[]!$&'()*+,;"
+
+
+class RedirectFastPath:
+    """ASGI middleware that answers GET /{short_code} before FastAPI routing.
+
+    It skips routing, dependency resolution, pydantic and exception handling
+    and sends a prebuilt response. Paths claimed by other single-segment
+    routes (/docs, /shorten, ...) are passed through to the app unchanged.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._reserved = None
+
+    def _reserved_paths(self, scope) -> set:
+        if self._reserved is None:
+            routes = getattr(scope.get("app"), "routes", [])
+            self._reserved = {
+                route.path[1:]
+                for route in routes
+                if getattr(route, "path", "").count("/") == 1 and "{" not in route.path
+            }
+        return self._reserved
+
+    async def __call__(self, scope, receive, send):
+        # Set REDIRECT_FAST_PATH=0 to route redirects through FastAPI instead
+        if not settings.redirect_fast_path or scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            return await self.app(scope, receive, send)
+
+        short_code = scope["path"][1:]
+        if not short_code or "/" in short_code or short_code in self._reserved_paths(scope):
+            return await self.app(scope, receive, send)
+
+        scope["metrics_route"] = "/{short_code}"  # Route label for MetricsMiddleware
+        status_code, long_url, cache_control = await resolve_redirect(short_code)
+
+        if long_url is None:
+            body = ERROR_BODIES[status_code]
+            headers = error_headers(body)
+        else:
+            body = b""
+            headers = [
+                (b"location", quote(long_url, safe=LOCATION_SAFE).encode("latin-1")),
+                (b"content-length", b"0"),
+                (b"cache-control", cache_control.encode("latin-1")),
+            ]
+            record_click(short_code, Request(scope))
+            if sampled():
+                logger.info("Redirecting %s to %s", short_code, long_url)
+
+        await send({"type": "http.response.start", "status": status_code, "headers": headers})
+        await send({"type": "http.response.body", "body": body if scope["method"] == "GET" else b""})
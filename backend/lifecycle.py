@@ -0,0 +1,119 @@
+import asyncio
+from datetime import datetime, timezone
+import time
+import logging
+
+import repository
+import analytics
+from config import settings
+from metrics import Counter, Histogram, LATENCY_BUCKETS
+from storage import storage
+
+
+logger = logging.getLogger(__name__)
+
+LIFECYCLE_ENABLED = settings.lifecycle_enabled
+
+LIFECYCLE_REMOVED = Counter("sink_lifecycle_removed_total", "Rows removed by lifecycle jobs.", ("job",))
+LIFECYCLE_DURATION = Histogram("sink_lifecycle_run_duration_seconds", "Wall time of one lifecycle job run.", ("job",), LATENCY_BUCKETS + (10.0, 30.0, 60.0, 300.0))
+
+
+class LifecycleJobs:
+    """Periodic background cleanup: expired links and orphaned click rollups.
+
+    Work is done in small indexed batches, and after each batch the job sleeps
+    long enough to stay under `max_rows_per_second`, so a large backlog is
+    spread out instead of competing with redirects for the database. Each run
+    logs how many rows it removed and how long it took.
+    """
+
+    def __init__(self, interval: float = 300, batch_size: int = 500, max_rows_per_second: float = 2000):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.max_rows_per_second = max_rows_per_second
+        self.last_report = {}
+        self._task = None
+
+    async def _pace(self, rows: int):
+        """Sleep for the time `rows` deletions are allowed to take at the configured rate."""
+        await asyncio.sleep(rows / self.max_rows_per_second)
+
+    async def expire_links(self) -> int:
+        """Delete expired links in batches; a no-op for backends that expire links themselves."""
+        if storage.native_expiry:
+            return 0
+        now = datetime.now(timezone.utc)
+        removed = 0
+        while True:
+            deleted = await repository.delete_expired(now, self.batch_size)
+            removed += deleted
+            if deleted < self.batch_size:
+                return removed
+            await self._pace(deleted)
+
+    async def compact_analytics(self) -> int:
+        """Delete click rollups whose short code no longer exists.
+
+        Alias edits move a link's rollups to its new code (analytics.rename_rollups),
+        so only links that were deleted or expired leave orphans behind.
+        """
+        if not analytics.ANALYTICS_ENABLED:
+            return 0
+        removed = 0
+        after = ""
+        while True:
+            short_codes = await analytics.rollup_short_codes(after, self.batch_size)
+            if not short_codes:
+                return removed
+            after = short_codes[-1]
+
+            orphans = set(short_codes) - await repository.existing_short_codes(short_codes)
+            if orphans:
+                deleted = await analytics.delete_rollups(list(orphans))
+                removed += deleted
+                await self._pace(deleted)
+            else:
+                await asyncio.sleep(0)
+
+    async def run_once(self) -> dict:
+        """Run every job once and return {job: {"removed", "seconds"}}."""
+        report = {}
+        for name, job in (("expire_links", self.expire_links), ("compact_analytics", self.compact_analytics)):
+            start = time.perf_counter()
+            try:
+                removed = await job()
+            except Exception as e:
+                logger.error(f"Lifecycle job {name} failed: {e}")
+                continue
+            elapsed = time.perf_counter() - start
+            LIFECYCLE_REMOVED.inc(name, amount=removed)
+            LIFECYCLE_DURATION.observe(elapsed, name)
+            report[name] = {"removed": removed, "seconds": round(elapsed, 3)}
+            if removed:
+                logger.info(f"Lifecycle {name}: removed {removed} rows in {elapsed:.2f}s")
+        self.last_report = report
+        return report
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.run_once()
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+lifecycle_jobs = LifecycleJobs(
+    interval=settings.lifecycle_interval,
+    batch_size=settings.lifecycle_batch_size,
+    max_rows_per_second=settings.lifecycle_max_rows_per_second,
+)
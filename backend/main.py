@@ -1,21 +1,69 @@
 from fastapi import FastAPI
-from Routes import shorten, redirect, edit
+from contextlib import asynccontextmanager
+from Routes import shorten, redirect, edit, bulk, stats, health, metrics as metrics_routes, export as export_routes
+import database
+from storage import storage
+from analytics import click_recorder, ANALYTICS_ENABLED
+from fastpath import RedirectFastPath
+from metrics import MetricsMiddleware, METRICS_ENABLED
+from profiler import profiler
+from lifecycle import lifecycle_jobs, LIFECYCLE_ENABLED
+from cache import link_cache
+from bloom import short_code_filter, SHORT_CODE_FILTER_ENABLED
+from qr import qr_render_pool
+from writebehind import write_behind, WRITE_BEHIND_ENABLED
+from security import blocklist
+from admission import AdmissionControl, rate_limiter, loop_lag, RATE_LIMIT_ENABLED
 from fastapi.middleware.cors import CORSMiddleware
-import uvicorn
-from dotenv import load_dotenv
-import os
+from config import settings
 import logging
 
 
-load_dotenv()
-
 logger = logging.getLogger(__name__)
 
 
-app = FastAPI()
-
-
-FRONTEND_URL = os.getenv("FRONTEND_URL")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Open the MongoDB pool (if configured) and the link storage on startup; release both on shutdown
+    await database.connect()
+    await storage.connect()
+    if WRITE_BEHIND_ENABLED:
+        await write_behind.start()  # Replays links journaled before a crash
+    await link_cache.start()
+    await blocklist.start()  # Loads BLOCKLIST_PATHS off the event loop, then watches them for changes
+    if RATE_LIMIT_ENABLED:
+        if settings.rate_limit_store == "redis":
+            rate_limiter.use_redis(link_cache.redis)  # Shares the link cache's connection pool
+        loop_lag.start()
+    if SHORT_CODE_FILTER_ENABLED:
+        short_code_filter.start()  # Built in the background; lookups go to the database until it is ready
+    if ANALYTICS_ENABLED:
+        click_recorder.start()
+    if LIFECYCLE_ENABLED:
+        lifecycle_jobs.start()  # Paced batch cleanup of expired links and orphaned analytics
+    app.state.ready = True  # GET /readyz starts passing
+    yield
+    app.state.ready = False
+    if LIFECYCLE_ENABLED:
+        await lifecycle_jobs.stop()
+    if ANALYTICS_ENABLED:
+        await click_recorder.stop()
+    await short_code_filter.stop()
+    await blocklist.stop()
+    await loop_lag.stop()
+    await link_cache.stop()
+    qr_render_pool.shutdown()
+    profiler.stop()
+    if WRITE_BEHIND_ENABLED:
+        await write_behind.stop()
+    await storage.close()
+    await database.close()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+FRONTEND_URL = settings.frontend_url
 if not FRONTEND_URL:
     logger.error("❌ FRONTEND_URL not found in .env file")
     raise ValueError("❌ FRONTEND_URL not found in .env file")
@@ -24,6 +72,9 @@ if not FRONTEND_URL:
 logger.info(f"Frontend URL: {FRONTEND_URL}")
 
 
+# Rate limit and shed write requests before routing; added first so CORS headers still wrap a 429
+app.add_middleware(AdmissionControl, max_concurrency=settings.write_max_concurrency, shed_loop_lag=settings.write_shed_loop_lag)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[FRONTEND_URL],  # Allow the frontend's origin
@@ -33,6 +84,14 @@ app.add_middleware(
 )
 
 
+# Answer GET /{short_code} before FastAPI routing (added last so it runs first)
+app.add_middleware(RedirectFastPath)
+
+# Time every request, fast-path redirects included (outermost)
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+
 # Log the allowed origins for debugging
 logger.info(f"Allow origins: {FRONTEND_URL}")
 
@@ -43,9 +102,15 @@ async def read_root():
 
 #include routes
 app.include_router(shorten.router)
+app.include_router(bulk.router)
+app.include_router(stats.router)
+app.include_router(health.router)
+app.include_router(metrics_routes.router)
+app.include_router(export_routes.router)
 app.include_router(redirect.router)
 app.include_router(edit.router)
 
 
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,144 @@
+import bisect
+from contextlib import contextmanager
+import time
+
+from config import settings
+
+
+# Set METRICS_ENABLED=0 to drop the request-timing middleware and GET /metrics
+METRICS_ENABLED = settings.metrics_enabled
+
+# Seconds; spans in-process cache hits (~10 µs) up to slow Atlas round trips
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+REGISTRY = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """Monotonic counter with optional labels, rendered in Prometheus text format."""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values = {}
+        REGISTRY.append(self)
+
+    def inc(self, *labels, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels) -> float:
+        return self._values.get(labels, 0)
+
+    def collect(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for labels, value in self._values.items():
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    """Fixed-bucket latency histogram; observe() is a bisect and two additions."""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._series = {}
+        REGISTRY.append(self)
+
+    def observe(self, value: float, *labels):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    @contextmanager
+    def time(self, *labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def collect(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total) in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class Gauge:
+    """Point-in-time value, read from `function` at scrape time so nothing is updated on the hot path."""
+
+    def __init__(self, name: str, documentation: str, function):
+        self.name = name
+        self.documentation = documentation
+        self.function = function
+        REGISTRY.append(self)
+
+    def collect(self) -> list:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge", f"{self.name} {self.function()}"]
+
+
+def render() -> str:
+    """Every registered metric in the Prometheus text exposition format."""
+    return "\n".join(line for metric in REGISTRY for line in metric.collect()) + "\n"
+
+
+REQUEST_LATENCY = Histogram("sink_http_request_duration_seconds", "HTTP request latency by route template.", ("method", "route", "status"))
+DB_LATENCY = Histogram("sink_db_call_duration_seconds", "Storage call latency.", ("backend", "operation"))
+QR_RENDER_LATENCY = Histogram("sink_qr_render_duration_seconds", "QR render latency, including time queued for a worker.", ("format",))
+QR_RENDER_REJECTED = Counter("sink_qr_render_rejected_total", "QR renders refused because the render pool was saturated.")
+SECURITY_CHECK_LATENCY = Histogram("sink_security_check_duration_seconds", "URL security check latency.", ("result",))
+CACHE_LOOKUPS = Counter("sink_cache_lookups_total", "Cache lookups by cache level and outcome.", ("cache", "result"))
+
+
+class MetricsMiddleware:
+    """ASGI middleware that times every HTTP request.
+
+    Requests are labelled with the matched route template (never the raw
+    path, to keep cardinality bounded); requests answered before routing can
+    name their template in scope["metrics_route"].
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = getattr(scope.get("route"), "path", None) or scope.get("metrics_route", "unmatched")
+            REQUEST_LATENCY.observe(time.perf_counter() - start, scope["method"], route, status_code)
@@ -0,0 +1,85 @@
+from collections import Counter
+import os
+import sys
+import threading
+import time
+import logging
+
+from config import settings
+
+
+logger = logging.getLogger(__name__)
+
+# Required in the X-Profiler-Token header; the profiler endpoints are disabled when unset
+PROFILER_TOKEN = settings.profiler_token
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """Statistical profiler for the event loop thread, toggled at runtime.
+
+    While running, a daemon thread wakes every `interval` seconds, reads the
+    target thread's current stack with sys._current_frames() and counts it.
+    Nothing is hooked into the profiled code, so overhead is one stack walk
+    per sample and zero when stopped. Results use the folded-stack format
+    that flamegraph.pl and speedscope read.
+    """
+
+    def __init__(self, max_depth: int = 64):
+        self.max_depth = max_depth
+        self.interval = None
+        self.samples = 0
+        self.stacks = Counter()
+        self.started_at = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self, interval: float = 0.005, thread_id: int = None):
+        """Start sampling `thread_id` (default: the calling thread), clearing earlier samples."""
+        if self.running:
+            return
+        self.interval = interval
+        self.samples = 0
+        self.stacks.clear()
+        self.started_at = time.time()
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(thread_id or threading.get_ident(),), name="sampling-profiler", daemon=True
+        )
+        self._thread.start()
+        logger.info(f"Sampling profiler started (every {interval * 1000:g} ms)")
+
+    def stop(self):
+        if not self.running:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        logger.info(f"Sampling profiler stopped after {self.samples} samples")
+
+    def _run(self, thread_id: int):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def folded(self) -> str:
+        """Sampled stacks as "root;...;leaf count" lines, most frequent first."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+profiler = SamplingProfiler()
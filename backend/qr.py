@@ -0,0 +1,191 @@
+import asyncio
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import hashlib
+import io
+import re
+import logging
+
+from config import settings
+from metrics import CACHE_LOOKUPS, QR_RENDER_LATENCY, QR_RENDER_REJECTED
+
+
+logger = logging.getLogger(__name__)
+
+# Accepted color format for QR foreground/background ("000000" or "#000000")
+COLOR_PATTERN = re.compile(r"^#?[0-9a-fA-F]{6}$")
+
+MEDIA_TYPES = {"png": "image/png", "svg": "image/svg+xml"}
+
+# L/M/Q/H recover roughly 7/15/25/30% damage; higher levels mean denser codes
+ERROR_CORRECTION_LEVELS = ("L", "M", "Q", "H")
+
+# Defaults for GET /qrcode when the query string doesn't override them
+QR_ERROR_CORRECTION = settings.qr_error_correction
+QR_BOX_SIZE = settings.qr_box_size
+
+
+def normalize_color(color: str) -> str:
+    """Return the color as '#rrggbb' or raise ValueError."""
+    if not COLOR_PATTERN.match(color):
+        raise ValueError(f"Invalid color '{color}'")
+    return "#" + color.lstrip("#").lower()
+
+
+def _build_qr(url: str, box_size: int, error_correction: str):
+    # qrcode (and PIL behind it) is imported on the first render, not at startup;
+    # renders run in the pool, so the import never blocks the event loop either
+    import qrcode
+    level = getattr(qrcode.constants, f"ERROR_CORRECT_{error_correction}")
+    qr = qrcode.QRCode(box_size=box_size, border=4, error_correction=level)
+    qr.add_data(url)
+    qr.make(fit=True)
+    return qr
+
+
+def render_png(url: str, fill_color: str, back_color: str, box_size: int, error_correction: str = "M") -> bytes:
+    """Render a QR code as PNG bytes."""
+    image = _build_qr(url, box_size, error_correction).make_image(fill_color=fill_color, back_color=back_color)
+    buffered = io.BytesIO()
+    image.save(buffered, format="PNG")
+    return buffered.getvalue()
+
+
+def render_svg(url: str, fill_color: str, back_color: str, box_size: int, error_correction: str = "M") -> bytes:
+    """Render a QR code as a single-path SVG document."""
+    matrix = _build_qr(url, box_size, error_correction).get_matrix()
+    size = len(matrix)
+    path = "".join(
+        f"M{x},{y}h1v1h-1z"
+        for y, row in enumerate(matrix)
+        for x, cell in enumerate(row)
+        if cell
+    )
+    svg = (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {size} {size}" '
+        f'width="{size * box_size}" height="{size * box_size}" shape-rendering="crispEdges">'
+        f'<rect width="100%" height="100%" fill="{back_color}"/>'
+        f'<path d="{path}" fill="{fill_color}"/></svg>'
+    )
+    return svg.encode("utf-8")
+
+
+RENDERERS = {"png": render_png, "svg": render_svg}
+
+
+class QRRenderCache:
+    """Bounded LRU cache of rendered QR images keyed by (url, colors, size, format)."""
+
+    def __init__(self, max_size: int = 512):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def set(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+qr_render_cache = QRRenderCache(max_size=settings.qr_cache_size)
+
+
+class QRRenderBusy(Exception):
+    """Raised when the render pool already has as much work as it accepts."""
+
+
+class QRRenderPool:
+    """Bounded executor that renders QR codes off the event loop.
+
+    At most `max_pending` renders may be queued or running at once; past that
+    render() raises QRRenderBusy immediately so callers shed load instead of
+    queueing work without bound. Threads suit a single worker process (PIL
+    releases the GIL while encoding); processes scale the pure-Python matrix
+    build across cores. The executor is created on first use.
+    """
+
+    def __init__(self, workers: int = 2, max_pending: int = 32, kind: str = "thread"):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown QR render pool kind '{kind}'")
+        self.workers = workers
+        self.max_pending = max_pending
+        self.kind = kind
+        self.pending = 0
+        self._executor = None
+
+    def _get_executor(self):
+        if self._executor is None:
+            executor_class = ProcessPoolExecutor if self.kind == "process" else ThreadPoolExecutor
+            self._executor = executor_class(max_workers=self.workers)
+        return self._executor
+
+    async def render(self, fmt: str, *args) -> bytes:
+        if self.pending >= self.max_pending:
+            QR_RENDER_REJECTED.inc()
+            raise QRRenderBusy()
+        self.pending += 1
+        try:
+            with QR_RENDER_LATENCY.time(fmt):
+                return await asyncio.get_running_loop().run_in_executor(self._get_executor(), RENDERERS[fmt], *args)
+        finally:
+            self.pending -= 1
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+qr_render_pool = QRRenderPool(
+    workers=settings.qr_render_workers,
+    max_pending=settings.qr_render_max_pending,
+    kind=settings.qr_render_pool,
+)
+
+# Renders in progress, so concurrent requests for the same image share one render
+_inflight = {}
+
+
+async def get_qr_image(url: str, fill_color: str = "#000000", back_color: str = "#ffffff", box_size: int = QR_BOX_SIZE,
+                       fmt: str = "png", error_correction: str = QR_ERROR_CORRECTION):
+    """Return (image bytes, etag) for a QR code, rendering it in the pool on a cache miss.
+
+    Raises QRRenderBusy if the pool is saturated.
+    """
+    key = (url, fill_color, back_color, box_size, fmt, error_correction)
+    cached = qr_render_cache.get(key)
+    if cached is not None:
+        CACHE_LOOKUPS.inc("qr", "hit")
+        return cached
+    CACHE_LOOKUPS.inc("qr", "miss")
+
+    future = _inflight.get(key)
+    if future is not None:
+        return await asyncio.shield(future)
+
+    future = asyncio.get_running_loop().create_future()
+    _inflight[key] = future
+    try:
+        body = await qr_render_pool.render(fmt, url, fill_color, back_color, box_size, error_correction)
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        qr_render_cache.set(key, (body, etag))
+        future.set_result((body, etag))
+        return body, etag
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        future.exception()  # Mark retrieved so an unawaited future doesn't warn
+        raise
+    finally:
+        del _inflight[key]
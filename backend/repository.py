@@ -0,0 +1,160 @@
+from datetime import datetime, timezone
+from typing import Optional
+
+from pymongo.errors import DuplicateKeyError
+
+from bloom import short_code_filter
+from config import settings
+from metrics import DB_LATENCY
+from storage import storage
+from writebehind import write_behind, WRITE_BEHIND_ENABLED
+
+
+async def resolve(short_code: str) -> Optional[dict]:
+    """Return {long_url, expiration_date} for a short code, or None.
+
+    Always asks storage: callers that cache the answer rely on a None being
+    real, so the short code filter is checked by LinkCache instead.
+    """
+    if WRITE_BEHIND_ENABLED and short_code in write_behind.by_short_code:
+        document = write_behind.by_short_code[short_code]
+        return {"long_url": document["long_url"], "expiration_date": document["expiration_date"]}
+    with DB_LATENCY.time(settings.storage_backend, "resolve"):
+        return await storage.resolve(short_code)
+
+
+async def short_code_exists(short_code: str) -> bool:
+    if WRITE_BEHIND_ENABLED and short_code in write_behind.by_short_code:
+        return True
+    if not short_code_filter.might_exist(short_code):
+        return False
+    with DB_LATENCY.time(settings.storage_backend, "short_code_exists"):
+        exists = await storage.short_code_exists(short_code)
+    if not exists:
+        short_code_filter.record_false_positive()
+    return exists
+
+
+async def lookup_by_url_hash(long_url_hash: bytes) -> Optional[dict]:
+    """Return {short_code, edit_id} of an existing link with this canonical URL digest, or None."""
+    if WRITE_BEHIND_ENABLED and long_url_hash in write_behind.by_url_hash:
+        document = write_behind.by_url_hash[long_url_hash]
+        return {"short_code": document["short_code"], "edit_id": document["edit_id"]}
+    with DB_LATENCY.time(settings.storage_backend, "lookup_by_url_hash"):
+        return await storage.lookup_by_url_hash(long_url_hash)
+
+
+async def insert_url(document: dict, checked: bool = False) -> None:
+    """Insert a new link, or journal it for a group commit when write-behind is on.
+
+    `checked` means the caller already knows the code is free (a counter code,
+    or an alias it just looked up), which saves write-behind a read.
+    """
+    document["updated_at"] = datetime.now(timezone.utc)
+    if WRITE_BEHIND_ENABLED and not checked:
+        # The code is acknowledged before MongoDB sees it, so a collision has to be caught now, not at flush.
+        # With the short code filter on, most fresh codes are ruled out without a read
+        if await short_code_exists(document["short_code"]):
+            raise DuplicateKeyError("short_code already exists", 11000, {"keyPattern": {"short_code": 1}})
+    short_code_filter.add(document["short_code"])
+    if WRITE_BEHIND_ENABLED:
+        await write_behind.append(document)
+    else:
+        with DB_LATENCY.time(settings.storage_backend, "create"):
+            await storage.create(document)
+
+
+async def get_edit_details(edit_id: str) -> Optional[dict]:
+    if WRITE_BEHIND_ENABLED:
+        await write_behind.flush_edit_id(edit_id)
+    with DB_LATENCY.time(settings.storage_backend, "get_edit_details"):
+        return await storage.get_edit_details(edit_id)
+
+
+async def edit_id_exists(edit_id: str) -> bool:
+    if WRITE_BEHIND_ENABLED:
+        await write_behind.flush_edit_id(edit_id)
+    with DB_LATENCY.time(settings.storage_backend, "edit_id_exists"):
+        return await storage.edit_id_exists(edit_id)
+
+
+async def update_by_edit_id(edit_id: str, updates: dict, now: datetime) -> Optional[dict]:
+    """Apply `updates` to a non-expired link in one round trip, bumping its version.
+
+    Returns the document as it was *before* the update ({long_url, short_code, version}),
+    or None if the edit_id does not exist or the link has already expired.
+    Raises DuplicateKeyError if the new short_code is taken.
+    """
+    if WRITE_BEHIND_ENABLED:
+        await write_behind.flush_edit_id(edit_id)
+    short_code_filter.add(updates.get("short_code"))
+    with DB_LATENCY.time(settings.storage_backend, "update_by_edit_id"):
+        return await storage.update_by_edit_id(edit_id, updates, now)
+
+
+async def lookup_many_by_url_hash(long_url_hashes: list) -> dict:
+    """Return {long_url_hash: {long_url_hash, short_code, edit_id}} for the digests that already exist."""
+    with DB_LATENCY.time(settings.storage_backend, "lookup_many_by_url_hash"):
+        found = await storage.lookup_many_by_url_hash(long_url_hashes)
+    if WRITE_BEHIND_ENABLED:
+        for long_url_hash in long_url_hashes:
+            if long_url_hash in write_behind.by_url_hash:
+                found[long_url_hash] = write_behind.by_url_hash[long_url_hash]
+    return found
+
+
+async def insert_many_urls(documents: list) -> list:
+    """Insert documents unordered; return the writeErrors of rejected ones (empty on success)."""
+    now = datetime.now(timezone.utc)
+    for document in documents:
+        document["updated_at"] = now
+    if WRITE_BEHIND_ENABLED:
+        await write_behind.flush()  # So the unique indexes also see codes and URLs that are still journaled
+    short_code_filter.add(*(document["short_code"] for document in documents))
+    with DB_LATENCY.time(settings.storage_backend, "create_many"):
+        return await storage.create_many(documents)
+
+
+async def estimated_count() -> int:
+    """Approximate number of stored links (journaled ones included)."""
+    with DB_LATENCY.time(settings.storage_backend, "estimated_count"):
+        count = await storage.estimated_count()
+    if WRITE_BEHIND_ENABLED:
+        count += len(write_behind.by_short_code)
+    return count
+
+
+async def delete_expired(now: datetime, limit: Optional[int] = None) -> int:
+    with DB_LATENCY.time(settings.storage_backend, "delete_expired"):
+        return await storage.delete_expired(now, limit)
+
+
+async def existing_short_codes(short_codes: list) -> set:
+    """Return the subset of `short_codes` that exist, journaled links included."""
+    with DB_LATENCY.time(settings.storage_backend, "existing_short_codes"):
+        found = await storage.existing_short_codes(short_codes)
+    if WRITE_BEHIND_ENABLED:
+        found.update(short_code for short_code in short_codes if short_code in write_behind.by_short_code)
+    return found
+
+
+async def resolve_many(short_codes: list) -> dict:
+    """Return {short_code: {long_url, expiration_date, edit_id}} for the codes that exist, journaled links included."""
+    with DB_LATENCY.time(settings.storage_backend, "resolve_many"):
+        found = await storage.resolve_many(short_codes)
+    if WRITE_BEHIND_ENABLED:
+        for short_code in short_codes:
+            if short_code in write_behind.by_short_code:
+                document = write_behind.by_short_code[short_code]
+                found[short_code] = {"long_url": document["long_url"], "expiration_date": document["expiration_date"], "edit_id": document["edit_id"]}
+    return found
+
+
+async def live_links_page(after: str, now: datetime, limit: int) -> list:
+    with DB_LATENCY.time(settings.storage_backend, "live_links_page"):
+        return await storage.live_links_page(after, now, limit)
+
+
+async def changed_links_page(after: tuple, until: datetime, limit: int) -> list:
+    with DB_LATENCY.time(settings.storage_backend, "changed_links_page"):
+        return await storage.changed_links_page(after, until, limit)
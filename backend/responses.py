@@ -0,0 +1,34 @@
+"""Response helpers shared by the routes and by the ASGI middlewares that answer before FastAPI routing."""
+import re
+from typing import Optional
+
+# Bodies matching FastAPI's HTTPException responses, by status code
+ERROR_BODIES = {
+    404: b'{"detail":"URL not found"}',
+    410: b'{"detail":"URL has expired"}',
+    429: b'{"detail":"Too many requests, retry later"}',
+    503: b'{"detail":"Server busy, retry shortly"}',
+}
+
+
+def error_headers(body: bytes) -> list:
+    """Raw ASGI headers for one of ERROR_BODIES."""
+    return [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+
+
+# One entity tag in an If-None-Match list; the group is the quoted opaque tag without W/
+ENTITY_TAG = re.compile(r'(?:W/)?("[^"]*")')
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches `etag`, so a 304 may be sent.
+
+    Uses the weak comparison RFC 9110 requires for If-None-Match: a W/ prefix
+    is ignored on either side, any tag in the list may match, and * matches
+    every current representation.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag.removeprefix("W/") in ENTITY_TAG.findall(if_none_match)
@@ -0,0 +1,75 @@
+"""Store canonical URL digests on existing documents.
+
+shorten_url dedupes on `long_url_hash` (see canonical.py). Documents created
+before that field existed are invisible to the dedupe check until this runs.
+When several legacy documents canonicalize to the same URL, only the first
+gets the digest (the index is unique); the rest are reported as near-duplicates
+and keep working as before. Run from the backend directory:
+
+    python -m scripts.backfill_url_hashes [--batch-size 1000] [--drop-long-url-index]
+"""
+import argparse
+import asyncio
+import logging
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+import database
+from canonical import url_digest
+
+
+logger = logging.getLogger(__name__)
+
+
+async def backfill(batch_size: int) -> tuple:
+    """Return (hashed, near_duplicates)."""
+    hashed = 0
+    near_duplicates = 0
+    cursor = database.collection.find(
+        {"long_url_hash": {"$exists": False}},
+        {"_id": 1, "long_url": 1},
+        batch_size=batch_size,
+    )
+
+    async def write(operations):
+        nonlocal hashed, near_duplicates
+        try:
+            result = await database.collection.bulk_write(operations, ordered=False)
+            hashed += result.modified_count
+        except BulkWriteError as e:
+            hashed += e.details.get("nModified", 0)
+            near_duplicates += len(e.details.get("writeErrors", []))
+
+    operations = []
+    async for doc in cursor:
+        operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"long_url_hash": url_digest(doc["long_url"])}}))
+        if len(operations) >= batch_size:
+            await write(operations)
+            operations = []
+    if operations:
+        await write(operations)
+
+    return hashed, near_duplicates
+
+
+async def main(batch_size: int, drop_long_url_index: bool):
+    await database.connect()
+    try:
+        hashed, near_duplicates = await backfill(batch_size)
+        logger.info(f"✅ Hashed {hashed} documents, {near_duplicates} near-duplicates left unhashed")
+
+        if drop_long_url_index:
+            # The hashed long_url index is no longer used by any route query
+            await database.collection.drop_index("long_url_hashed")
+            logger.info("Dropped long_url_hashed index")
+    finally:
+        await database.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill canonical long URL digests.")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--drop-long-url-index", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(main(args.batch_size, args.drop_long_url_index))
@@ -0,0 +1,76 @@
+"""Fail if any route query falls back to a collection scan.
+
+Runs explain() for the query shape of every repository lookup and exits
+non-zero if a winning plan contains a COLLSCAN stage. Run from the backend
+directory against a database with indexes in place:
+
+    python -m scripts.check_query_plans
+
+The SQLite backend runs offline, so its plans are checked by pytest in
+tests/test_query_plans.py instead.
+"""
+import asyncio
+from datetime import datetime, timezone
+import sys
+
+import database
+from canonical import url_digest
+
+
+# (name, filter) for each query issued by storage/mongo.py
+QUERY_SHAPES = [
+    ("resolve", {"short_code": "probe"}),
+    ("short_code_exists", {"short_code": "probe"}),
+    ("lookup_by_url_hash", {"long_url_hash": url_digest("https://example.com/probe")}),
+    ("lookup_many_by_url_hash", {"long_url_hash": {"$in": [url_digest("https://example.com/a"), url_digest("https://example.com/b")]}}),
+    ("get_edit_details", {"edit_id": "probe"}),
+    ("edit_id_exists", {"edit_id": "probe"}),
+    ("update_by_edit_id", {"edit_id": "probe", "$or": [{"expiration_date": None}, {"expiration_date": {"$gt": datetime.now(timezone.utc)}}]}),
+    ("delete_expired", {"expiration_date": {"$lte": datetime.now(timezone.utc)}}),
+    ("existing_short_codes", {"short_code": {"$in": ["probe1", "probe2"]}}),
+    ("short_codes_page", {"short_code": {"$gt": "probe"}}),
+    ("resolve_many", {"short_code": {"$in": ["probe1", "probe2"]}}),
+    ("live_links_page", {"short_code": {"$gt": "probe"}, "$or": [{"expiration_date": None}, {"expiration_date": {"$gt": datetime.now(timezone.utc)}}]}),
+    ("changed_links_page", {"updated_at": {"$gte": datetime.now(timezone.utc), "$lte": datetime.now(timezone.utc)}, "$or": [{"updated_at": {"$gt": datetime.now(timezone.utc)}}, {"short_code": {"$gt": "probe"}}]}),
+]
+
+
+def plan_stages(plan: dict):
+    """Yield every stage name in an explain() plan tree."""
+    yield plan.get("stage")
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            yield from plan_stages(plan[key])
+    for child in plan.get("inputStages", []):
+        yield from plan_stages(child)
+
+
+async def check_query_plans() -> list:
+    """Return the names of queries whose winning plan uses a COLLSCAN."""
+    failures = []
+    for name, query in QUERY_SHAPES:
+        explanation = await database.collection.find(query).explain()
+        stages = set(plan_stages(explanation["queryPlanner"]["winningPlan"]))
+        status = "COLLSCAN" if "COLLSCAN" in stages else "ok"
+        print(f"{name:<24} {status:<9} {sorted(s for s in stages if s)}")
+        if "COLLSCAN" in stages:
+            failures.append(name)
+    return failures
+
+
+async def main() -> int:
+    await database.connect()
+    try:
+        failures = await check_query_plans()
+    finally:
+        await database.close()
+
+    if failures:
+        print(f"❌ Collection scans in: {', '.join(failures)}")
+        return 1
+    print("✅ All route queries use an index")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,106 @@
+"""Export the live redirect map for serving links from the edge.
+
+Writes, under --out:
+
+  _redirects            Cloudflare Pages rules for permanent links (at most
+                        2000, the Pages limit), to deploy with the frontend.
+                        Codes other than [A-Za-z0-9_-]+ are left to the app.
+  shards/shard-N.json   Every live link sorted by short_code, --shard-size per
+                        file, as [short_code, long_url, expires_at, link] rows
+                        (expires_at in epoch seconds or null).
+  shards/manifest.json  First/last code and row count of each shard, plus the
+                        cursor to pass to GET /export/changes afterwards.
+
+With --top N only the N most clicked links of the last --hours are exported
+(needs click analytics). Links are read in keyset pages of EXPORT_PAGE_SIZE,
+so memory stays constant however many links exist. Run from the backend
+directory:
+
+    python -m scripts.export_redirects --out dist [--top 2000] [--shard-size 5000]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+
+import database
+import export
+from storage import storage
+
+
+logger = logging.getLogger(__name__)
+
+
+def links(hot: list = None):
+    """A fresh async iterator over the links to export (all live ones unless `hot` is given), by short_code."""
+    if hot is None:
+        return export.live_links()
+    return export.iterate(sorted(hot, key=lambda doc: doc["short_code"]))
+
+
+async def write_redirects(path: str, docs) -> int:
+    written = 0
+    with open(path, "w") as f:
+        async for doc in docs:
+            if not export.pages_servable(doc):
+                continue
+            f.write(export.redirects_line(doc))
+            written += 1
+            if written >= export.PAGES_REDIRECT_LIMIT:
+                logger.warning(f"_redirects truncated at the Pages limit of {export.PAGES_REDIRECT_LIMIT} rules")
+                break
+    return written
+
+
+async def write_shards(directory: str, docs, shard_size: int, cursor: str) -> int:
+    os.makedirs(directory, exist_ok=True)
+    shards = []
+    rows = []
+
+    def flush():
+        name = f"shard-{len(shards):05d}.json"
+        with open(os.path.join(directory, name), "w") as f:
+            json.dump({"rows": rows}, f, separators=(",", ":"))
+        shards.append({"file": name, "first": rows[0][0], "last": rows[-1][0], "count": len(rows)})
+
+    async for doc in docs:
+        expires_at = doc["expiration_date"].timestamp() if doc["expiration_date"] else None
+        rows.append([doc["short_code"], doc["long_url"], expires_at, export.link_id(doc["edit_id"])])
+        if len(rows) >= shard_size:
+            flush()
+            rows = []
+    if rows:
+        flush()
+
+    with open(os.path.join(directory, "manifest.json"), "w") as f:
+        json.dump({"cursor": cursor, "count": sum(shard["count"] for shard in shards), "shards": shards}, f, indent=2)
+    return len(shards)
+
+
+async def main(out: str, top: int, hours: float, shard_size: int):
+    await database.connect()
+    await storage.connect()
+    try:
+        os.makedirs(out, exist_ok=True)
+        cursor = export.snapshot_cursor()  # Taken first, so changes made during the export are replayed
+        hot = await export.hot_links(top, hours) if top is not None else None
+
+        written = await write_redirects(os.path.join(out, "_redirects"), links(hot))
+        logger.info(f"✅ Wrote {written} rules to {os.path.join(out, '_redirects')}")
+
+        count = await write_shards(os.path.join(out, "shards"), links(hot), shard_size, cursor)
+        logger.info(f"✅ Wrote {count} shards to {os.path.join(out, 'shards')}; continue from cursor {cursor}")
+    finally:
+        await storage.close()
+        await database.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the live redirect map for edge serving.")
+    parser.add_argument("--out", default="dist", help="output directory")
+    parser.add_argument("--top", type=int, help="only the N most clicked links")
+    parser.add_argument("--hours", type=float, default=24, help="click window for --top")
+    parser.add_argument("--shard-size", type=int, default=5000)
+    args = parser.parse_args()
+    asyncio.run(main(args.out, args.top, args.hours, args.shard_size))
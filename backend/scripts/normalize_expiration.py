@@ -0,0 +1,64 @@
+"""Convert legacy expiration_date values to BSON datetimes.
+
+Older documents store expiration_date as an ISO string or an extended-JSON
+{"$date": ...} dict. MongoStorage parses those on read, so redirects and
+edit pages work before this has run, but the TTL index never expires them
+and the expiry filters of PUT /edit and the export skip them, so run this
+once after deploying. From the backend directory:
+
+    python -m scripts.normalize_expiration [--batch-size 1000]
+"""
+import argparse
+import asyncio
+import logging
+
+from pymongo import UpdateOne
+
+import database
+from storage.mongo import parse_expiration
+
+
+logger = logging.getLogger(__name__)
+
+
+async def normalize_expiration(batch_size: int) -> int:
+    converted = 0
+    cursor = database.collection.find(
+        {"expiration_date": {"$type": ["string", "object"]}},
+        {"_id": 1, "expiration_date": 1},
+        batch_size=batch_size,
+    )
+    operations = []
+    async for doc in cursor:
+        expiration_date = parse_expiration(doc["expiration_date"])
+        if expiration_date is None:
+            logger.warning(f"Unparseable expiration_date on {doc['_id']}: {doc['expiration_date']!r}")
+            continue
+        operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"expiration_date": expiration_date}}))
+
+        if len(operations) >= batch_size:
+            await database.collection.bulk_write(operations, ordered=False)
+            converted += len(operations)
+            operations = []
+
+    if operations:
+        await database.collection.bulk_write(operations, ordered=False)
+        converted += len(operations)
+
+    return converted
+
+
+async def main(batch_size: int):
+    await database.connect()
+    try:
+        converted = await normalize_expiration(batch_size)
+        logger.info(f"✅ Done, normalized expiration_date on {converted} documents")
+    finally:
+        await database.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Normalize legacy expiration_date values to datetimes.")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(main(args.batch_size))
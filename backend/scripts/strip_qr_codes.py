@@ -0,0 +1,47 @@
+"""Remove stored base64 QR code blobs from the urls collection.
+
+QR codes are rendered on demand by GET /qrcode/{short_code}, so the
+`qr_code` field is dead weight on every read. Run from the backend directory:
+
+    python -m scripts.strip_qr_codes [--batch-size 1000]
+"""
+import argparse
+import asyncio
+import logging
+
+import database
+
+
+logger = logging.getLogger(__name__)
+
+
+async def strip_qr_codes(batch_size: int) -> int:
+    """Unset `qr_code` in batches of _ids so no single write locks the collection for long."""
+    stripped = 0
+    while True:
+        cursor = database.collection.find({"qr_code": {"$exists": True}}, {"_id": 1}).limit(batch_size)
+        ids = [doc["_id"] async for doc in cursor]
+        if not ids:
+            break
+
+        result = await database.collection.update_many({"_id": {"$in": ids}}, {"$unset": {"qr_code": ""}})
+        stripped += result.modified_count
+        logger.info(f"Stripped QR codes from {stripped} documents so far")
+
+    return stripped
+
+
+async def main(batch_size: int):
+    await database.connect()
+    try:
+        stripped = await strip_qr_codes(batch_size)
+        logger.info(f"✅ Done, removed qr_code from {stripped} documents")
+    finally:
+        await database.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Strip stored QR code blobs from URL documents.")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(main(args.batch_size))
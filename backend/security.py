@@ -1,27 +1,127 @@
+import asyncio
 import re
+import os
+import time
+import logging
 from urllib.parse import urlparse
 
+from config import settings
+from metrics import SECURITY_CHECK_LATENCY
+
+
+logger = logging.getLogger(__name__)
+
 # List of blocked domains
 BLOCKED_DOMAINS = ["example-scam.com", "badwebsite.net", "phishing-site.org"]
 
 # Suspicious TLDs commonly used in phishing attacks
 SUSPICIOUS_TLDS = {"zip", "xyz", "top", "info", "buzz", "click", "work", "gq", "tk"}
 
-def is_blocked_domain(url: str) -> bool:
-    """Check if the URL contains a blocked domain."""
-    domain = urlparse(url).netloc
-    for blocked in BLOCKED_DOMAINS:
-        if domain.endswith(blocked):
-            return True
-    return False
+# Hexadecimal runs in a domain (common in phishing URLs)
+HEX_PATTERN = re.compile(r"[0-9a-f]{8,}")
 
-def is_suspicious_url(url: str) -> bool:
-    """Check if the URL has suspicious patterns (too many subdomains, bad TLDs)."""
-    parsed_url = urlparse(url)
-    domain = parsed_url.netloc
-    
+
+class DomainBlocklist:
+    """Set of blocked domains matched by label suffix.
+
+    A host is blocked if it or any parent domain is in the set, so lookups cost
+    one hash probe per label regardless of how many domains are loaded. Files
+    hold one domain per line (hosts-file lines like "0.0.0.0 bad.com" and
+    "#" comments are accepted). start() loads them in a thread, then a
+    background task checks their mtimes every reload_interval seconds and
+    reloads them the same way, so a large list never stalls the event loop
+    or import. If any file cannot be read, the previous set stays in use.
+    """
+
+    def __init__(self, domains=(), paths=(), reload_interval: float = 30):
+        self.static_domains = {self._normalize(domain) for domain in domains}
+        self.paths = list(paths)
+        self.reload_interval = reload_interval
+        self._domains = set(self.static_domains)
+        self._mtimes = {}
+        self._task = None
+
+    @staticmethod
+    def _normalize(domain: str) -> str:
+        return domain.strip().lower().lstrip("*.").rstrip(".")
+
+    def _read(self, path: str) -> set:
+        domains = set()
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.split("#", 1)[0].split()
+                if line:
+                    domains.add(self._normalize(line[-1]))
+        return domains
+
+    def reload(self):
+        """Reload the files if any changed; blocking, so run it off the event loop."""
+        try:
+            mtimes = {path: os.stat(path).st_mtime_ns for path in self.paths}
+            if mtimes == self._mtimes:
+                return
+            domains = set(self.static_domains)
+            for path in self.paths:
+                domains |= self._read(path)
+        except (OSError, UnicodeDecodeError) as e:
+            logger.error(f"Blocklist reload failed, keeping {len(self._domains)} domains: {e}")
+            return
+        self._domains = domains  # Swap in the new set in one assignment
+        self._mtimes = mtimes
+        logger.info(f"Loaded {len(domains)} blocked domains")
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            try:
+                await asyncio.to_thread(self.reload)
+            except Exception as e:
+                logger.error(f"Blocklist reload failed: {e}")
+
+    async def start(self):
+        """Load the files, then watch them for changes."""
+        if self.paths:
+            await asyncio.to_thread(self.reload)
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def contains(self, host: str) -> bool:
+        labels = host.split(".")
+        for i in range(len(labels)):
+            if ".".join(labels[i:]) in self._domains:
+                return True
+        return False
+
+    def __len__(self):
+        return len(self._domains)
+
+
+blocklist = DomainBlocklist(
+    BLOCKED_DOMAINS,
+    paths=[path for path in settings.blocklist_paths.split(os.pathsep) if path],
+    reload_interval=settings.blocklist_reload_interval,
+)
+
+
+def _host(url: str) -> str:
+    return urlparse(url).hostname or ""
+
+def is_blocked_host(host: str) -> bool:
+    """Check if the host or one of its parent domains is blocked."""
+    return blocklist.contains(host)
+
+def is_suspicious_host(host: str) -> bool:
+    """Check if the host has suspicious patterns (too many subdomains, bad TLDs)."""
     # Check for excessive subdomains (e.g., "weird.sub.suspicious.com")
-    subdomains = domain.split(".")
+    subdomains = host.split(".")
     if len(subdomains) > 3:  # Adjust threshold if needed
         return True
 
@@ -31,11 +131,19 @@ def is_suspicious_url(url: str) -> bool:
         return True
 
     # Check for hexadecimal patterns in domain (common in phishing URLs)
-    if re.search(r"[0-9a-f]{8,}", domain):  
+    if HEX_PATTERN.search(host):
         return True
 
     return False
 
+def is_blocked_domain(url: str) -> bool:
+    """Check if the URL contains a blocked domain."""
+    return is_blocked_host(_host(url))
+
+def is_suspicious_url(url: str) -> bool:
+    """Check if the URL has suspicious patterns (too many subdomains, bad TLDs)."""
+    return is_suspicious_host(_host(url))
+
 def validate_url_format(url: str):
     """Validate the URL format."""
     regex = r'^(https?://)?([a-z0-9]+([-.][a-z0-9]+)*\.[a-z]{2,})'
@@ -43,13 +151,19 @@ def validate_url_format(url: str):
         raise ValueError("Invalid URL format.")
 
 def check_url_security(url: str) -> bool:
-    """Perform security checks on a URL."""
-    if is_blocked_domain(url):
-        print("❌ URL is in the blocked domain list!")
+    """Perform security checks on a URL, parsing it only once."""
+    start = time.perf_counter()
+    result = _check_host(_host(url))
+    SECURITY_CHECK_LATENCY.observe(time.perf_counter() - start, "pass" if result else "reject")
+    return result
+
+def _check_host(host: str) -> bool:
+    if is_blocked_host(host):
+        logger.info("❌ URL is in the blocked domain list!")
         return False
 
-    if is_suspicious_url(url):
-        print("⚠️ URL looks suspicious based on domain analysis.")
+    if is_suspicious_host(host):
+        logger.info("⚠️ URL looks suspicious based on domain analysis.")
         return False
 
     # try:
@@ -58,7 +172,7 @@ def check_url_security(url: str) -> bool:
     #     print(f"❌ URL validation failed: {e}")
     #     return False
 
-    print("✅ URL passed security checks.")
+    logger.debug("✅ URL passed security checks.")
     return True
 
 # # Test cases
@@ -0,0 +1,14 @@
+from config import settings
+from storage.base import Storage
+
+
+def create_storage(backend: str) -> Storage:
+    # Backends are imported on demand so the unused one costs nothing at startup
+    if backend == "mongo":
+        from storage.mongo import MongoStorage
+        return MongoStorage()
+    from storage.sqlite import SQLiteStorage
+    return SQLiteStorage(settings.sqlite_path)
+
+
+storage = create_storage(settings.storage_backend)
@@ -0,0 +1,103 @@
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Optional
+
+
+class Storage(ABC):
+    """Link storage backend.
+
+    Documents are plain dicts with short_code, long_url, long_url_hash,
+    expiration_date (aware UTC datetime or None) and edit_id, plus a version
+    counter (0 when absent) bumped by every edit and an updated_at timestamp
+    (absent on legacy documents) set on insert and on every edit. Uniqueness
+    violations on short_code, edit_id or long_url_hash raise pymongo's
+    DuplicateKeyError with details["keyPattern"] naming the field, whatever
+    the backend, so callers handle collisions one way.
+    """
+
+    # True if the backend removes expired links by itself (e.g. a TTL index)
+    native_expiry = False
+
+    async def connect(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    async def ping(self) -> None:
+        """Raise if the backend cannot serve queries; used by the readiness probe."""
+
+    @abstractmethod
+    async def resolve(self, short_code: str) -> Optional[dict]:
+        """Return {long_url, expiration_date} for a short code, or None."""
+
+    @abstractmethod
+    async def short_code_exists(self, short_code: str) -> bool:
+        ...
+
+    @abstractmethod
+    async def lookup_by_url_hash(self, long_url_hash: bytes) -> Optional[dict]:
+        """Return {short_code, edit_id} of the link with this canonical URL digest, or None."""
+
+    @abstractmethod
+    async def lookup_many_by_url_hash(self, long_url_hashes: list) -> dict:
+        """Return {long_url_hash: {long_url_hash, short_code, edit_id}} for the digests that exist."""
+
+    @abstractmethod
+    async def create(self, document: dict) -> None:
+        ...
+
+    @abstractmethod
+    async def create_many(self, documents: list) -> list:
+        """Insert unordered; return [{index, code, keyPattern, errmsg}] for rejected documents."""
+
+    @abstractmethod
+    async def get_edit_details(self, edit_id: str) -> Optional[dict]:
+        """Return {long_url, custom_alias, expiration_date, short_code, version}, or None."""
+
+    @abstractmethod
+    async def edit_id_exists(self, edit_id: str) -> bool:
+        ...
+
+    @abstractmethod
+    async def update_by_edit_id(self, edit_id: str, updates: dict, now: datetime) -> Optional[dict]:
+        """Atomically apply `updates` to a non-expired link and increment its version.
+
+        Returns {long_url, short_code, version} as they were before the update, or None
+        if the edit_id does not exist or the link has expired.
+        """
+
+    @abstractmethod
+    async def delete_expired(self, now: datetime, limit: Optional[int] = None) -> int:
+        """Delete links whose expiration_date has passed, oldest first; return how many were removed.
+
+        With a limit, at most that many are removed so callers can work in paced batches.
+        """
+
+    @abstractmethod
+    async def existing_short_codes(self, short_codes: list) -> set:
+        """Return the subset of `short_codes` that exist."""
+
+    @abstractmethod
+    async def short_codes_page(self, after: str, limit: int) -> list:
+        """Return up to `limit` short codes greater than `after`, in ascending order."""
+
+    @abstractmethod
+    async def resolve_many(self, short_codes: list) -> dict:
+        """Return {short_code: {long_url, expiration_date, edit_id}} for the codes that exist."""
+
+    @abstractmethod
+    async def live_links_page(self, after: str, now: datetime, limit: int) -> list:
+        """Return up to `limit` non-expired {short_code, long_url, expiration_date, edit_id} after `after`, by short_code."""
+
+    @abstractmethod
+    async def changed_links_page(self, after: tuple, until: datetime, limit: int) -> list:
+        """Return up to `limit` links changed after the (updated_at, short_code) cursor and at or before `until`.
+
+        Each is {short_code, long_url, expiration_date, edit_id, updated_at}, ordered by
+        (updated_at, short_code); expired links are included so consumers can drop them.
+        """
+
+    @abstractmethod
+    async def estimated_count(self) -> int:
+        ...
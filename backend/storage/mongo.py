@@ -0,0 +1,159 @@
+from datetime import datetime, timezone
+from typing import Optional
+import logging
+
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError
+
+import database
+from storage.base import Storage
+
+
+logger = logging.getLogger(__name__)
+
+# Projections: each query only pulls the fields its caller actually reads
+RESOLVE_FIELDS = {"_id": 0, "long_url": 1, "expiration_date": 1}
+DEDUPE_FIELDS = {"_id": 0, "short_code": 1, "edit_id": 1}
+EDIT_DETAILS_FIELDS = {"_id": 0, "long_url": 1, "custom_alias": 1, "expiration_date": 1, "short_code": 1, "version": 1}
+EDIT_PREVIOUS_FIELDS = {"_id": 0, "long_url": 1, "short_code": 1, "version": 1}
+EXPORT_FIELDS = {"_id": 0, "short_code": 1, "long_url": 1, "expiration_date": 1, "edit_id": 1}
+CHANGE_FIELDS = {**EXPORT_FIELDS, "updated_at": 1}
+
+
+def parse_expiration(value):
+    """Parse a legacy expiration value (ISO string, {"$date": ...}) into an aware UTC datetime, or None if unparseable."""
+    if isinstance(value, dict):
+        value = value.get("$date")
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value / 1000, tz=timezone.utc)
+    if not isinstance(value, str):
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def _normalized(doc: Optional[dict]) -> Optional[dict]:
+    """Return `doc` with a datetime-or-None expiration_date, or None if it cannot be read.
+
+    Documents written before expiries were stored as datetimes still hold
+    strings or {"$date": ...} dicts until scripts/normalize_expiration.py has
+    run; they are parsed here so redirects and edits keep working meanwhile.
+    """
+    if doc is None:
+        return None
+    value = doc.get("expiration_date")
+    if value is None or isinstance(value, datetime):
+        return doc
+    parsed = parse_expiration(value)
+    if parsed is None:
+        logger.error(f"Unreadable expiration_date {value!r}, treating the link as missing; run scripts/normalize_expiration.py")
+        return None
+    logger.warning(f"Legacy expiration_date {value!r} parsed on read; run scripts/normalize_expiration.py")
+    doc["expiration_date"] = parsed
+    return doc
+
+
+class MongoStorage(Storage):
+    """Links in the MongoDB `urls` collection; expiry handled by its TTL index.
+
+    The client and its indexes are owned by database.py, which main.py
+    connects and closes alongside the storage backend.
+    """
+
+    native_expiry = True
+
+    def __init__(self):
+        self.collection = database.collection
+
+    async def ping(self):
+        await database.client.admin.command("ping")
+
+    async def resolve(self, short_code: str) -> Optional[dict]:
+        return _normalized(await self.collection.find_one({"short_code": short_code}, RESOLVE_FIELDS))
+
+    async def short_code_exists(self, short_code: str) -> bool:
+        return await self.collection.find_one({"short_code": short_code}, {"_id": 1}) is not None
+
+    async def lookup_by_url_hash(self, long_url_hash: bytes) -> Optional[dict]:
+        return await self.collection.find_one({"long_url_hash": long_url_hash}, DEDUPE_FIELDS)
+
+    async def lookup_many_by_url_hash(self, long_url_hashes: list) -> dict:
+        cursor = self.collection.find({"long_url_hash": {"$in": long_url_hashes}}, {"_id": 0, "long_url_hash": 1, **DEDUPE_FIELDS})
+        return {doc["long_url_hash"]: doc async for doc in cursor}
+
+    async def create(self, document: dict) -> None:
+        await self.collection.insert_one(document)
+
+    async def create_many(self, documents: list) -> list:
+        try:
+            await self.collection.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            return e.details.get("writeErrors", [])
+        return []
+
+    async def get_edit_details(self, edit_id: str) -> Optional[dict]:
+        return _normalized(await self.collection.find_one({"edit_id": edit_id}, EDIT_DETAILS_FIELDS))
+
+    async def edit_id_exists(self, edit_id: str) -> bool:
+        return await self.collection.find_one({"edit_id": edit_id}, {"_id": 1}) is not None
+
+    async def update_by_edit_id(self, edit_id: str, updates: dict, now: datetime) -> Optional[dict]:
+        # One round trip: the filter excludes expired links, the unique index rejects taken aliases
+        return await self.collection.find_one_and_update(
+            {"edit_id": edit_id, "$or": [{"expiration_date": None}, {"expiration_date": {"$gt": now}}]},
+            {"$set": {**updates, "updated_at": now}, "$inc": {"version": 1}},
+            projection=EDIT_PREVIOUS_FIELDS,
+            return_document=ReturnDocument.BEFORE,
+        )
+
+    async def delete_expired(self, now: datetime, limit: Optional[int] = None) -> int:
+        expired = {"expiration_date": {"$lte": now}}
+        if limit is None:
+            result = await self.collection.delete_many(expired)
+            return result.deleted_count
+        # Walk the expiration_date index for one bounded batch, then delete exactly those
+        cursor = self.collection.find(expired, {"_id": 1}).sort("expiration_date", 1).limit(limit)
+        ids = [doc["_id"] async for doc in cursor]
+        if not ids:
+            return 0
+        result = await self.collection.delete_many({"_id": {"$in": ids}, **expired})
+        return result.deleted_count
+
+    async def existing_short_codes(self, short_codes: list) -> set:
+        cursor = self.collection.find({"short_code": {"$in": short_codes}}, {"_id": 0, "short_code": 1})
+        return {doc["short_code"] async for doc in cursor}
+
+    async def short_codes_page(self, after: str, limit: int) -> list:
+        # Covered by the short_code index: no documents are fetched
+        cursor = self.collection.find({"short_code": {"$gt": after}}, {"_id": 0, "short_code": 1}).sort("short_code", 1).limit(limit)
+        return [doc["short_code"] async for doc in cursor]
+
+    async def resolve_many(self, short_codes: list) -> dict:
+        cursor = self.collection.find({"short_code": {"$in": short_codes}}, EXPORT_FIELDS)
+        return {doc.pop("short_code"): doc async for doc in cursor if _normalized(doc)}
+
+    async def live_links_page(self, after: str, now: datetime, limit: int) -> list:
+        cursor = self.collection.find(
+            {"short_code": {"$gt": after}, "$or": [{"expiration_date": None}, {"expiration_date": {"$gt": now}}]},
+            EXPORT_FIELDS,
+        ).sort("short_code", 1).limit(limit)
+        return [doc async for doc in cursor]
+
+    async def changed_links_page(self, after: tuple, until: datetime, limit: int) -> list:
+        updated_at, short_code = after
+        cursor = self.collection.find(
+            {
+                "updated_at": {"$gte": updated_at, "$lte": until},
+                "$or": [{"updated_at": {"$gt": updated_at}}, {"short_code": {"$gt": short_code}}],
+            },
+            CHANGE_FIELDS,
+        ).sort([("updated_at", 1), ("short_code", 1)]).limit(limit)
+        return [doc async for doc in cursor if _normalized(doc)]
+
+    async def estimated_count(self) -> int:
+        return await self.collection.estimated_document_count()
@@ -0,0 +1,231 @@
+from datetime import datetime, timezone
+import sqlite3
+from typing import Optional
+import logging
+
+from pymongo.errors import DuplicateKeyError
+
+from storage.base import Storage
+
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ("short_code", "long_url", "long_url_hash", "expiration_date", "edit_id")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS urls (
+    short_code TEXT PRIMARY KEY,
+    long_url TEXT NOT NULL,
+    long_url_hash BLOB UNIQUE,
+    expiration_date REAL,
+    edit_id TEXT NOT NULL UNIQUE,
+    version INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS urls_expiration_date ON urls (expiration_date) WHERE expiration_date IS NOT NULL;
+"""
+
+# Run after SCHEMA, once any columns added since a database was created exist
+INDEXES = """
+CREATE INDEX IF NOT EXISTS urls_updated_at ON urls (updated_at, short_code) WHERE updated_at IS NOT NULL;
+"""
+
+
+def _to_timestamp(value: Optional[datetime]) -> Optional[float]:
+    return value.timestamp() if value else None
+
+
+def _from_timestamp(value: Optional[float]) -> Optional[datetime]:
+    return datetime.fromtimestamp(value, tz=timezone.utc) if value is not None else None
+
+
+def _duplicate_key_error(error: sqlite3.IntegrityError) -> DuplicateKeyError:
+    """Translate "UNIQUE constraint failed: urls.<field>" into pymongo's error shape."""
+    field = str(error).rsplit(".", 1)[-1]
+    return DuplicateKeyError(str(error), 11000, {"keyPattern": {field: 1}, "errmsg": str(error)})
+
+
+class SQLiteStorage(Storage):
+    """Embedded single-file backend for single-node edge deployments.
+
+    Runs in WAL mode with memory-mapped reads. Every query is a primary-key or
+    unique-index probe on a local file, so it executes inline on the event loop
+    in microseconds with no network hop. Expired links are removed in batches
+    by the lifecycle jobs (lifecycle.py).
+    """
+
+    def __init__(self, path: str, mmap_size: int = 256 * 1024 * 1024):
+        self.path = path
+        self.mmap_size = mmap_size
+        self._conn = None
+
+    async def connect(self):
+        self._conn = sqlite3.connect(self.path, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")  # Durable at checkpoints; no fsync per commit in WAL mode
+        self._conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+        self._conn.executescript(SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(urls)")}
+        if "updated_at" not in columns:
+            self._conn.execute("ALTER TABLE urls ADD COLUMN updated_at REAL")
+        self._conn.executescript(INDEXES)
+        logger.info(f"✅ Opened SQLite storage at {self.path}")
+
+    async def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    async def ping(self):
+        if self._conn is None:
+            raise sqlite3.ProgrammingError("SQLite storage is not open")
+        self._conn.execute("SELECT 1")
+
+    async def resolve(self, short_code: str) -> Optional[dict]:
+        row = self._conn.execute("SELECT long_url, expiration_date FROM urls WHERE short_code = ?", (short_code,)).fetchone()
+        if row is None:
+            return None
+        return {"long_url": row[0], "expiration_date": _from_timestamp(row[1])}
+
+    async def short_code_exists(self, short_code: str) -> bool:
+        return self._conn.execute("SELECT 1 FROM urls WHERE short_code = ?", (short_code,)).fetchone() is not None
+
+    async def lookup_by_url_hash(self, long_url_hash: bytes) -> Optional[dict]:
+        row = self._conn.execute("SELECT short_code, edit_id FROM urls WHERE long_url_hash = ?", (long_url_hash,)).fetchone()
+        if row is None:
+            return None
+        return {"short_code": row[0], "edit_id": row[1]}
+
+    async def lookup_many_by_url_hash(self, long_url_hashes: list) -> dict:
+        if not long_url_hashes:
+            return {}
+        placeholders = ",".join("?" * len(long_url_hashes))
+        rows = self._conn.execute(
+            f"SELECT long_url_hash, short_code, edit_id FROM urls WHERE long_url_hash IN ({placeholders})",
+            long_url_hashes,
+        ).fetchall()
+        return {row[0]: {"long_url_hash": row[0], "short_code": row[1], "edit_id": row[2]} for row in rows}
+
+    def _insert(self, document: dict):
+        self._conn.execute(
+            "INSERT INTO urls (short_code, long_url, long_url_hash, expiration_date, edit_id, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                document["short_code"],
+                document["long_url"],
+                document.get("long_url_hash"),
+                _to_timestamp(document.get("expiration_date")),
+                document["edit_id"],
+                _to_timestamp(document.get("updated_at")),
+            ),
+        )
+
+    async def create(self, document: dict) -> None:
+        try:
+            self._insert(document)
+        except sqlite3.IntegrityError as e:
+            raise _duplicate_key_error(e)
+
+    async def create_many(self, documents: list) -> list:
+        errors = []
+        self._conn.execute("BEGIN")
+        try:
+            for index, document in enumerate(documents):
+                try:
+                    self._insert(document)
+                except sqlite3.IntegrityError as e:
+                    error = _duplicate_key_error(e)
+                    errors.append({"index": index, "code": 11000, **error.details})
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        return errors
+
+    async def get_edit_details(self, edit_id: str) -> Optional[dict]:
+        row = self._conn.execute("SELECT long_url, expiration_date, short_code, version FROM urls WHERE edit_id = ?", (edit_id,)).fetchone()
+        if row is None:
+            return None
+        return {"long_url": row[0], "custom_alias": None, "expiration_date": _from_timestamp(row[1]), "short_code": row[2], "version": row[3]}
+
+    async def edit_id_exists(self, edit_id: str) -> bool:
+        return self._conn.execute("SELECT 1 FROM urls WHERE edit_id = ?", (edit_id,)).fetchone() is not None
+
+    async def update_by_edit_id(self, edit_id: str, updates: dict, now: datetime) -> Optional[dict]:
+        columns = [column for column in updates if column in COLUMNS]
+        values = [_to_timestamp(updates[column]) if column == "expiration_date" else updates[column] for column in columns]
+
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = self._conn.execute(
+                "SELECT long_url, short_code, version FROM urls WHERE edit_id = ? AND (expiration_date IS NULL OR expiration_date > ?)",
+                (edit_id, now.timestamp()),
+            ).fetchone()
+            if row is not None:
+                assignments = "".join(f"{column} = ?, " for column in columns)
+                self._conn.execute(
+                    f"UPDATE urls SET {assignments}updated_at = ?, version = version + 1 WHERE edit_id = ?",
+                    (*values, now.timestamp(), edit_id),
+                )
+            self._conn.execute("COMMIT")
+        except sqlite3.IntegrityError as e:
+            self._conn.execute("ROLLBACK")
+            raise _duplicate_key_error(e)
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+
+        if row is None:
+            return None
+        return {"long_url": row[0], "short_code": row[1], "version": row[2]}
+
+    async def delete_expired(self, now: datetime, limit: Optional[int] = None) -> int:
+        if limit is None:
+            cursor = self._conn.execute("DELETE FROM urls WHERE expiration_date <= ?", (now.timestamp(),))
+        else:
+            cursor = self._conn.execute(
+                "DELETE FROM urls WHERE short_code IN ("
+                " SELECT short_code FROM urls WHERE expiration_date <= ? ORDER BY expiration_date LIMIT ?)",
+                (now.timestamp(), limit),
+            )
+        return cursor.rowcount
+
+    async def existing_short_codes(self, short_codes: list) -> set:
+        if not short_codes:
+            return set()
+        placeholders = ",".join("?" * len(short_codes))
+        rows = self._conn.execute(f"SELECT short_code FROM urls WHERE short_code IN ({placeholders})", short_codes).fetchall()
+        return {row[0] for row in rows}
+
+    async def short_codes_page(self, after: str, limit: int) -> list:
+        rows = self._conn.execute("SELECT short_code FROM urls WHERE short_code > ? ORDER BY short_code LIMIT ?", (after, limit)).fetchall()
+        return [row[0] for row in rows]
+
+    async def resolve_many(self, short_codes: list) -> dict:
+        if not short_codes:
+            return {}
+        placeholders = ",".join("?" * len(short_codes))
+        rows = self._conn.execute(f"SELECT short_code, long_url, expiration_date, edit_id FROM urls WHERE short_code IN ({placeholders})", short_codes).fetchall()
+        return {row[0]: {"long_url": row[1], "expiration_date": _from_timestamp(row[2]), "edit_id": row[3]} for row in rows}
+
+    async def live_links_page(self, after: str, now: datetime, limit: int) -> list:
+        rows = self._conn.execute(
+            "SELECT short_code, long_url, expiration_date, edit_id FROM urls"
+            " WHERE short_code > ? AND (expiration_date IS NULL OR expiration_date > ?) ORDER BY short_code LIMIT ?",
+            (after, now.timestamp(), limit),
+        ).fetchall()
+        return [{"short_code": row[0], "long_url": row[1], "expiration_date": _from_timestamp(row[2]), "edit_id": row[3]} for row in rows]
+
+    async def changed_links_page(self, after: tuple, until: datetime, limit: int) -> list:
+        updated_at, short_code = after
+        rows = self._conn.execute(
+            "SELECT short_code, long_url, expiration_date, edit_id, updated_at FROM urls"
+            " WHERE (updated_at, short_code) > (?, ?) AND updated_at <= ? ORDER BY updated_at, short_code LIMIT ?",
+            (updated_at.timestamp(), short_code, until.timestamp(), limit),
+        ).fetchall()
+        return [
+            {"short_code": row[0], "long_url": row[1], "expiration_date": _from_timestamp(row[2]), "edit_id": row[3], "updated_at": _from_timestamp(row[4])}
+            for row in rows
+        ]
+
+    async def estimated_count(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM urls").fetchone()[0]
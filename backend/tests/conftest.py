@@ -0,0 +1,10 @@
+"""Shared test setup. From the backend directory: python -m pytest tests"""
+import os
+from pathlib import Path
+import sys
+
+# Tests build what they need themselves; keep config from demanding MONGO_URI or a journal
+os.environ.setdefault("STORAGE_BACKEND", "sqlite")
+os.environ.setdefault("WRITE_BEHIND", "0")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,27 @@
+from starlette.requests import Request
+import pytest
+
+import admission
+from admission import client_ip
+
+
+def request(forwarded_for: str = None, client=("192.0.2.1", 5000)) -> Request:
+    headers = [(b"x-forwarded-for", forwarded_for.encode())] if forwarded_for is not None else []
+    return Request({"type": "http", "headers": headers, "client": client})
+
+
+@pytest.mark.parametrize("proxy_hops, forwarded_for, expected", [
+    (1, "203.0.113.9", "203.0.113.9"),
+    (1, "6.6.6.6, 203.0.113.9", "203.0.113.9"),  # The client's own entry is ignored
+    (2, "6.6.6.6, 203.0.113.9, 10.0.0.2", "203.0.113.9"),
+    (2, "203.0.113.9", "203.0.113.9"),  # Fewer entries than hops: the leftmost
+    (0, "6.6.6.6", "192.0.2.1"),  # No proxies: X-Forwarded-For is not trusted at all
+    (1, None, "192.0.2.1"),
+])
+def test_client_ip_counts_proxy_hops_from_the_end(monkeypatch, proxy_hops, forwarded_for, expected):
+    monkeypatch.setattr(admission, "PROXY_HOPS", proxy_hops)
+    assert client_ip(request(forwarded_for)) == expected
+
+
+def test_client_ip_without_a_peer_address():
+    assert client_ip(request(client=None)) == "unknown"
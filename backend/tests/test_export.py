@@ -0,0 +1,23 @@
+from datetime import datetime, timezone
+
+import pytest
+
+import export
+
+
+def test_cursor_round_trips_exactly():
+    updated_at = datetime(2025, 3, 1, 12, 30, 15, 123456, tzinfo=timezone.utc)
+    assert export.decode_cursor(export.encode_cursor(updated_at, "abc")) == (updated_at, "abc")
+
+
+@pytest.mark.parametrize("cursor", [
+    "",
+    "123",
+    "abc:x",
+    "-1:x",
+    "1.5:x",
+    "99999999999999999999999:x",
+])
+def test_bad_cursors_are_rejected_with_one_message(cursor):
+    with pytest.raises(ValueError, match="^invalid cursor$"):
+        export.decode_cursor(cursor)
@@ -0,0 +1,74 @@
+"""No SQLite storage query falls back to a full table scan.
+
+The offline counterpart of scripts/check_query_plans.py, which needs a live
+MongoDB. Each Storage method runs against a temporary database with its
+statements traced, and EXPLAIN QUERY PLAN must show an index search for
+every one of them rather than a "SCAN urls".
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from canonical import url_digest
+from storage.sqlite import SQLiteStorage
+
+
+NOW = datetime.now(timezone.utc)
+
+# (name, call) for each query issued by storage/sqlite.py. estimated_count is
+# left out: SQLite keeps no row count, so COUNT(*) always walks an index.
+QUERY_SHAPES = [
+    ("resolve", lambda storage: storage.resolve("probe")),
+    ("short_code_exists", lambda storage: storage.short_code_exists("probe")),
+    ("lookup_by_url_hash", lambda storage: storage.lookup_by_url_hash(url_digest("https://example.com/probe"))),
+    ("lookup_many_by_url_hash", lambda storage: storage.lookup_many_by_url_hash([url_digest("https://example.com/a"), url_digest("https://example.com/b")])),
+    ("get_edit_details", lambda storage: storage.get_edit_details("probe")),
+    ("edit_id_exists", lambda storage: storage.edit_id_exists("probe")),
+    ("update_by_edit_id", lambda storage: storage.update_by_edit_id("e2", {"expiration_date": None}, NOW)),
+    ("delete_expired", lambda storage: storage.delete_expired(NOW)),
+    ("delete_expired batched", lambda storage: storage.delete_expired(NOW, limit=10)),
+    ("existing_short_codes", lambda storage: storage.existing_short_codes(["probe1", "probe2"])),
+    ("short_codes_page", lambda storage: storage.short_codes_page("probe", 10)),
+    ("resolve_many", lambda storage: storage.resolve_many(["probe1", "probe2"])),
+    ("live_links_page", lambda storage: storage.live_links_page("probe", NOW, 10)),
+    ("changed_links_page", lambda storage: storage.changed_links_page((NOW - timedelta(hours=1), "probe"), NOW, 10)),
+]
+
+
+def plan(storage: SQLiteStorage, statement: str) -> list:
+    return [row[3] for row in storage._conn.execute(f"EXPLAIN QUERY PLAN {statement}")]
+
+
+async def traced_plans(path: str, call) -> list:
+    """Run one storage call and return the query plan of every statement it issued."""
+    storage = SQLiteStorage(path)
+    await storage.connect()
+    try:
+        for i in range(20):
+            long_url = f"https://example.com/{i}"
+            await storage.create({
+                "short_code": f"c{i}",
+                "long_url": long_url,
+                "long_url_hash": url_digest(long_url),
+                "expiration_date": NOW + timedelta(days=i - 10) if i % 2 else None,
+                "edit_id": f"e{i}",
+            })
+
+        statements = []
+        storage._conn.set_trace_callback(statements.append)
+        await call(storage)
+        storage._conn.set_trace_callback(None)
+
+        queries = [s for s in statements if s.split(None, 1)[0].upper() in ("SELECT", "UPDATE", "DELETE")]
+        assert queries, statements
+        return [(query, plan(storage, query)) for query in queries]
+    finally:
+        await storage.close()
+
+
+@pytest.mark.parametrize("name, call", QUERY_SHAPES, ids=[name for name, _ in QUERY_SHAPES])
+def test_query_uses_an_index(name, call, tmp_path):
+    for query, details in asyncio.run(traced_plans(str(tmp_path / "plans.db"), call)):
+        scans = [detail for detail in details if detail.startswith("SCAN urls")]
+        assert not scans, f"{name}: {query} -> {details}"
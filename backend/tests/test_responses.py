@@ -0,0 +1,25 @@
+import pytest
+
+from responses import etag_matches
+
+
+@pytest.mark.parametrize("if_none_match, matches", [
+    ('"v3"', True),
+    ('W/"v3"', True),  # Weak comparison: the W/ prefix is ignored
+    ('"v1", "v3"', True),
+    ('"v1",W/"v3" , "v4"', True),
+    ("*", True),
+    (' * ', True),
+    ('"v31"', False),
+    ('"v1", "v2"', False),
+    ('v3', False),  # Not a quoted entity tag
+    ('"a,b"', False),  # Commas inside a tag do not split it
+    ("", False),
+    (None, False),
+])
+def test_if_none_match_uses_weak_comparison(if_none_match, matches):
+    assert etag_matches(if_none_match, '"v3"') is matches
+
+
+def test_a_weak_etag_matches_its_strong_form():
+    assert etag_matches('"abc"', 'W/"abc"')
@@ -0,0 +1,150 @@
+"""Storage backends honour the Storage contract.
+
+Runs the same scenario against each backend: round trips, uniqueness errors
+and their keyPattern, bulk insert errors, conditional edits and expiry
+sweeps. SQLite runs against a temporary file; MongoDB runs only when
+MONGO_URI is set, with throwaway short codes that are removed afterwards.
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+import os
+import secrets
+
+from pymongo.errors import DuplicateKeyError
+import pytest
+
+import database
+from canonical import url_digest
+from storage.base import Storage
+from storage.sqlite import SQLiteStorage
+
+
+def link(prefix: str, name: str, expiration_date: datetime = None) -> dict:
+    long_url = f"https://example.com/{prefix}/{name}"
+    return {
+        "short_code": f"{prefix}{name}",
+        "long_url": long_url,
+        "long_url_hash": url_digest(long_url),
+        "expiration_date": expiration_date,
+        "edit_id": f"{prefix}e{name}",
+    }
+
+
+async def expect_duplicate(coroutine, field: str):
+    try:
+        await coroutine
+    except DuplicateKeyError as e:
+        assert field in e.details["keyPattern"], e.details
+    else:
+        raise AssertionError(f"expected DuplicateKeyError on {field}")
+
+
+async def check(storage: Storage, prefix: str):
+    now = datetime.now(timezone.utc)
+    later = now + timedelta(days=1)
+
+    permanent, expiring, expired = link(prefix, "a"), link(prefix, "b", later), link(prefix, "c", now - timedelta(seconds=1))
+    for document in (permanent, expiring, expired):
+        await storage.create(dict(document))
+
+    # Round trips keep aware UTC datetimes
+    resolved = await storage.resolve(expiring["short_code"])
+    assert resolved["long_url"] == expiring["long_url"]
+    assert abs(resolved["expiration_date"] - later) < timedelta(milliseconds=1), resolved
+    assert (await storage.resolve(permanent["short_code"]))["expiration_date"] is None
+    assert await storage.resolve(f"{prefix}missing") is None
+    assert await storage.short_code_exists(permanent["short_code"])
+    assert not await storage.short_code_exists(f"{prefix}missing")
+
+    # Uniqueness violations name the offending field
+    await expect_duplicate(storage.create({**link(prefix, "d"), "short_code": permanent["short_code"]}), "short_code")
+    await expect_duplicate(storage.create({**link(prefix, "e"), "long_url_hash": permanent["long_url_hash"]}), "long_url_hash")
+
+    found = await storage.lookup_by_url_hash(permanent["long_url_hash"])
+    assert (found["short_code"], found["edit_id"]) == (permanent["short_code"], permanent["edit_id"]), found
+    assert await storage.lookup_by_url_hash(url_digest(f"https://example.com/{prefix}/missing")) is None
+
+    many = await storage.lookup_many_by_url_hash([permanent["long_url_hash"], expiring["long_url_hash"], url_digest("https://example.com/none")])
+    assert set(many) == {permanent["long_url_hash"], expiring["long_url_hash"]}, many
+    assert many[expiring["long_url_hash"]]["short_code"] == expiring["short_code"]
+
+    # Unordered bulk insert keeps going past errors and reports their index
+    batch = [link(prefix, "f"), {**link(prefix, "g"), "long_url_hash": permanent["long_url_hash"]}, link(prefix, "h")]
+    errors = await storage.create_many(batch)
+    assert [(error["index"], "long_url_hash" in error["keyPattern"]) for error in errors] == [(1, True)], errors
+    assert await storage.short_code_exists(f"{prefix}h")
+    assert not await storage.short_code_exists(f"{prefix}g")
+
+    details = await storage.get_edit_details(expiring["edit_id"])
+    assert details["short_code"] == expiring["short_code"] and details["long_url"] == expiring["long_url"], details
+    assert details.get("version", 0) == 0, details
+    assert await storage.get_edit_details(f"{prefix}missing") is None
+    assert await storage.edit_id_exists(expiring["edit_id"])
+    assert not await storage.edit_id_exists(f"{prefix}missing")
+
+    # Edits return the previous state and only apply to live links
+    previous = await storage.update_by_edit_id(expiring["edit_id"], {"short_code": f"{prefix}z", "expiration_date": None}, now)
+    assert previous["short_code"] == expiring["short_code"], previous
+    assert previous.get("version", 0) == 0, previous
+    assert (await storage.get_edit_details(expiring["edit_id"]))["version"] == 1
+    assert (await storage.resolve(f"{prefix}z"))["expiration_date"] is None
+    assert await storage.resolve(expiring["short_code"]) is None
+    await expect_duplicate(storage.update_by_edit_id(permanent["edit_id"], {"short_code": f"{prefix}z"}, now), "short_code")
+    assert (await storage.resolve(permanent["short_code"]))["long_url"] == permanent["long_url"]
+    assert await storage.update_by_edit_id(expired["edit_id"], {"expiration_date": None}, now) is None
+    assert await storage.update_by_edit_id(f"{prefix}missing", {"expiration_date": None}, now) is None
+
+    assert await storage.existing_short_codes([permanent["short_code"], expired["short_code"], f"{prefix}missing"]) == {permanent["short_code"], expired["short_code"]}
+
+    # Keyset pages are ascending and resume strictly after the cursor
+    page = await storage.short_codes_page(prefix, 2)
+    assert page == sorted(page) and all(code > prefix for code in page)
+    assert page[-1] not in await storage.short_codes_page(page[-1], 2)
+
+    # Export reads: live links in code order, and changes paged by (updated_at, short_code)
+    live = [doc for doc in await storage.live_links_page(prefix, now, 1000) if doc["short_code"].startswith(prefix)]
+    assert [doc["short_code"] for doc in live] == sorted(doc["short_code"] for doc in live)
+    assert permanent["short_code"] in {doc["short_code"] for doc in live} and expired["short_code"] not in {doc["short_code"] for doc in live}
+    resolved = await storage.resolve_many([permanent["short_code"], f"{prefix}missing"])
+    assert set(resolved) == {permanent["short_code"]} and resolved[permanent["short_code"]]["edit_id"] == permanent["edit_id"], resolved
+    window = (now - timedelta(seconds=1), ""), now + timedelta(seconds=1)
+    changed = [doc for doc in await storage.changed_links_page(*window, 1000) if doc["short_code"].startswith(prefix)]
+    assert [doc["short_code"] for doc in changed] == [f"{prefix}z"], changed  # Only the edit stamped updated_at
+    assert abs(changed[0]["updated_at"] - now) < timedelta(milliseconds=1), changed
+    assert f"{prefix}z" not in {doc["short_code"] for doc in await storage.changed_links_page((changed[0]["updated_at"], f"{prefix}z"), window[1], 1000)}
+
+    # Batched deletes honour the limit (a TTL index may already have removed `expired`)
+    assert await storage.delete_expired(now, limit=1) <= 1
+    await storage.delete_expired(now)
+    assert await storage.resolve(expired["short_code"]) is None
+    assert await storage.resolve(permanent["short_code"]) is not None
+
+    assert await storage.estimated_count() >= 4
+
+
+async def run(backend: str, tmpdir: str):
+    prefix = f"t{secrets.token_hex(4)}"
+    if backend == "sqlite":
+        storage = SQLiteStorage(os.path.join(tmpdir, "conformance.db"))
+        await storage.connect()
+        try:
+            await check(storage, prefix)
+        finally:
+            await storage.close()
+        return
+
+    from storage.mongo import MongoStorage
+    await database.connect()
+    try:
+        await check(MongoStorage(), prefix)
+    finally:
+        await database.collection.delete_many({"short_code": {"$regex": f"^{prefix}"}})
+        await database.close()
+
+
+@pytest.mark.parametrize("backend", [
+    "sqlite",
+    pytest.param("mongo", marks=pytest.mark.skipif(database.client is None, reason="MONGO_URI is not set")),
+])
+def test_backend_honours_the_storage_contract(backend, tmp_path):
+    asyncio.run(run(backend, str(tmp_path)))
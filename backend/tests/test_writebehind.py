@@ -0,0 +1,232 @@
+import asyncio
+import hashlib
+import logging
+
+import bson
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+import pytest
+
+import writebehind
+from writebehind import WriteBehindJournal
+
+
+class FakeCollection:
+    """The two collection methods the journal uses, with a unique short_code and injectable failures."""
+
+    def __init__(self):
+        self.documents = {}
+        self.failing = set()  # Short codes whose insert fails with a retryable error
+        self.down = False
+
+    async def insert_many(self, documents, ordered=True):
+        if self.down:
+            raise ConnectionError("MongoDB unreachable")
+        errors = []
+        for index, document in enumerate(documents):
+            if document["short_code"] in self.failing:
+                errors.append({"index": index, "code": 91, "errmsg": "shutdown in progress"})
+            elif document["short_code"] in self.documents:
+                errors.append({"index": index, "code": 11000, "errmsg": "E11000 duplicate key"})
+            else:
+                self.documents[document["short_code"]] = document
+        if errors:
+            raise BulkWriteError({"writeErrors": errors})
+
+    async def find_one(self, query, projection=None):
+        document = self.documents.get(query["short_code"])
+        if document is not None and all(document.get(key) == value for key, value in query.items()):
+            return {"_id": query["short_code"]}
+        return None
+
+
+def link(short_code: str, edit_id: str = None) -> dict:
+    long_url = f"https://example.com/{short_code}"
+    return {
+        "short_code": short_code,
+        "long_url": long_url,
+        "long_url_hash": hashlib.blake2b(long_url.encode(), digest_size=16).digest(),
+        "expiration_date": None,
+        "edit_id": edit_id or f"edit-{short_code}",
+    }
+
+
+@pytest.fixture
+def mongo(monkeypatch):
+    collection = FakeCollection()
+    monkeypatch.setattr(writebehind, "collection", collection)
+    return collection
+
+
+@pytest.fixture
+def journal_path(tmp_path):
+    return str(tmp_path / "writebehind.db")
+
+
+async def crash(journal: WriteBehindJournal):
+    """Stop a journal the way a killed process would: no final flush."""
+    journal._task.cancel()
+    try:
+        await journal._task
+    except asyncio.CancelledError:
+        pass
+    journal._close()
+
+
+def journaled(path: str) -> list:
+    journal = WriteBehindJournal(path)
+    journal._open()
+    try:
+        return [row[0] for row in journal._conn.execute("SELECT short_code FROM pending ORDER BY id")]
+    finally:
+        journal._close()
+
+
+def test_replays_links_left_by_a_crash(mongo, journal_path):
+    async def scenario():
+        mongo.down = True
+        journal = WriteBehindJournal(journal_path, flush_interval=3600)
+        await journal.start()
+        for short_code in ("a", "b", "c"):
+            await journal.append(link(short_code))
+        await crash(journal)
+
+        mongo.down = False
+        restarted = WriteBehindJournal(journal_path, flush_interval=3600)
+        await restarted.start()
+        try:
+            assert restarted.by_short_code == {}
+        finally:
+            await restarted.stop()
+
+    asyncio.run(scenario())
+    assert sorted(mongo.documents) == ["a", "b", "c"]
+    assert journaled(journal_path) == []
+
+
+def test_replay_of_already_inserted_links_is_not_a_collision(mongo, journal_path, caplog):
+    async def scenario():
+        mongo.down = True
+        journal = WriteBehindJournal(journal_path, flush_interval=3600)
+        await journal.start()
+        await journal.append(link("a"))
+        await journal.append(link("b"))
+        await crash(journal)
+
+        # "a" reached MongoDB before the crash, its journal row was never deleted;
+        # "b" was meanwhile taken by a different link
+        mongo.down = False
+        mongo.documents["a"] = link("a")
+        mongo.documents["b"] = link("b", edit_id="someone-else")
+        restarted = WriteBehindJournal(journal_path, flush_interval=3600)
+        await restarted.start()
+        await restarted.stop()
+
+    with caplog.at_level(logging.ERROR, logger="writebehind"):
+        asyncio.run(scenario())
+    assert journaled(journal_path) == []
+    assert mongo.documents["b"]["edit_id"] == "someone-else"
+    dropped = [record.getMessage() for record in caplog.records if "Dropping" in record.getMessage()]
+    assert len(dropped) == 1 and "'b'" in dropped[0]
+
+
+def test_flush_that_fails_partway_keeps_the_rest_journaled(mongo, journal_path):
+    async def scenario():
+        journal = WriteBehindJournal(journal_path, flush_interval=3600)
+        await journal.start()
+        try:
+            for short_code in ("a", "b", "c"):
+                await journal.append(link(short_code))
+
+            mongo.failing = {"b"}
+            assert await journal.flush() == 2
+            assert list(journal.by_short_code) == ["b"]
+            assert [bson.decode(row[1])["short_code"] for row in journal._select()] == ["b"]
+
+            mongo.failing = set()
+            assert await journal.flush() == 1
+            assert journal.by_short_code == {}
+        finally:
+            await journal.stop()
+
+    asyncio.run(scenario())
+    assert sorted(mongo.documents) == ["a", "b", "c"]
+
+
+def test_flush_while_mongo_is_down_loses_nothing(mongo, journal_path):
+    async def scenario():
+        journal = WriteBehindJournal(journal_path, flush_interval=3600)
+        await journal.start()
+        try:
+            await journal.append(link("a"))
+            mongo.down = True
+            assert await journal.flush() == 0
+            assert "a" in journal.by_short_code
+            mongo.down = False
+            assert await journal.flush() == 1
+        finally:
+            await journal.stop()
+
+    asyncio.run(scenario())
+    assert list(mongo.documents) == ["a"]
+
+
+def test_a_second_process_cannot_share_the_journal(mongo, journal_path):
+    async def scenario():
+        journal = WriteBehindJournal(journal_path, flush_interval=3600)
+        await journal.start()
+        try:
+            with pytest.raises(ValueError, match="in use by another process"):
+                await WriteBehindJournal(journal_path).start()
+        finally:
+            await journal.stop()
+
+    asyncio.run(scenario())
+
+
+def test_a_code_taken_in_storage_is_refused_before_it_is_journaled(mongo, journal_path, tmp_path, monkeypatch):
+    import repository
+    from storage.sqlite import SQLiteStorage
+
+    async def scenario():
+        storage = SQLiteStorage(str(tmp_path / "links.db"))
+        await storage.connect()
+        journal = WriteBehindJournal(journal_path, flush_interval=3600)
+        await journal.start()
+        monkeypatch.setattr(repository, "storage", storage)
+        monkeypatch.setattr(repository, "write_behind", journal)
+        monkeypatch.setattr(repository, "WRITE_BEHIND_ENABLED", True)
+        try:
+            await storage.create(link("a"))
+            with pytest.raises(DuplicateKeyError):
+                await repository.insert_url(link("a", edit_id="someone-else"))
+            assert journal.by_short_code == {}
+
+            await repository.insert_url(link("b"))
+            assert list(journal.by_short_code) == ["b"]
+        finally:
+            await journal.stop()
+            await storage.close()
+
+    asyncio.run(scenario())
+
+
+def test_a_code_known_to_be_free_is_journaled_without_a_read(mongo, journal_path, monkeypatch):
+    import repository
+
+    class UnreachableStorage:
+        async def short_code_exists(self, short_code):
+            raise AssertionError("checked codes must not cost a read")
+
+    async def scenario():
+        journal = WriteBehindJournal(journal_path, flush_interval=3600)
+        await journal.start()
+        monkeypatch.setattr(repository, "storage", UnreachableStorage())
+        monkeypatch.setattr(repository, "write_behind", journal)
+        monkeypatch.setattr(repository, "WRITE_BEHIND_ENABLED", True)
+        try:
+            await repository.insert_url(link("a"), checked=True)
+            assert list(journal.by_short_code) == ["a"]
+        finally:
+            await journal.stop()
+
+    asyncio.run(scenario())
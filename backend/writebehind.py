@@ -0,0 +1,221 @@
+import asyncio
+import sqlite3
+import threading
+import logging
+
+import bson
+from bson.codec_options import CodecOptions
+from pymongo.errors import DuplicateKeyError
+
+from config import settings
+from database import collection
+from metrics import DB_LATENCY
+
+
+logger = logging.getLogger(__name__)
+
+WRITE_BEHIND_ENABLED = settings.write_behind
+
+if WRITE_BEHIND_ENABLED and settings.storage_backend != "mongo":
+    logger.error("❌ WRITE_BEHIND only applies to the mongo storage backend")
+    raise ValueError("❌ WRITE_BEHIND only applies to the mongo storage backend")
+
+CODEC_OPTIONS = CodecOptions(tz_aware=True)
+
+
+class WriteBehindJournal:
+    """Durable local journal of new links, group-committed to MongoDB in the background.
+
+    append() returns once the record is committed to a SQLite WAL journal
+    (synchronous=FULL), so POST /shorten no longer waits on Atlas. A worker
+    drains the journal with unordered insert_many and deletes rows only after
+    MongoDB accepted them; on startup, rows left by a crash are replayed.
+    Pending records are kept in memory so reads resolve them immediately.
+
+    The journal is locked exclusively by the process that opens it: pending
+    records live in that process's memory, so a second worker sharing the
+    file would flush rows it never remembered and serve stale ones.
+    """
+
+    def __init__(self, path: str, batch_size: int = 500, flush_interval: float = 0.2):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.by_short_code = {}
+        self.by_url_hash = {}
+        self.by_edit_id = {}
+        self._conn = None
+        self._lock = threading.Lock()
+        self._wakeup = None
+        self._flush_lock = None
+        self._task = None
+
+    # SQLite work runs in a thread so fsyncs never block the event loop
+
+    def _open(self):
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=1)
+        try:
+            # Held until close; set before WAL so no shared-memory index lets others in
+            self._conn.execute("PRAGMA locking_mode=EXCLUSIVE")
+            self._conn.execute("BEGIN EXCLUSIVE")
+            self._conn.execute("COMMIT")
+        except sqlite3.OperationalError:
+            self._conn.close()
+            self._conn = None
+            logger.error(f"❌ Write-behind journal {self.path} is in use by another process")
+            raise ValueError(f"❌ Write-behind journal {self.path} is in use by another process; run a single worker per journal")
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pending ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " short_code TEXT NOT NULL UNIQUE,"
+            " document BLOB NOT NULL)"
+        )
+
+    def _insert(self, short_code: str, document: bytes):
+        with self._lock:
+            self._conn.execute("INSERT INTO pending (short_code, document) VALUES (?, ?)", (short_code, document))
+
+    def _select(self, limit: int = -1) -> list:
+        with self._lock:
+            return self._conn.execute("SELECT id, document FROM pending ORDER BY id LIMIT ?", (limit,)).fetchall()
+
+    def _delete(self, ids: list):
+        with self._lock:
+            self._conn.executemany("DELETE FROM pending WHERE id = ?", [(row_id,) for row_id in ids])
+
+    def _close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _remember(self, document: dict):
+        self.by_short_code[document["short_code"]] = document
+        self.by_edit_id[document["edit_id"]] = document
+        if document.get("long_url_hash"):
+            self.by_url_hash[document["long_url_hash"]] = document
+
+    def _forget(self, document: dict):
+        self.by_short_code.pop(document["short_code"], None)
+        self.by_edit_id.pop(document["edit_id"], None)
+        self.by_url_hash.pop(document.get("long_url_hash"), None)
+
+    async def append(self, document: dict):
+        """Durably journal a new link document; raises DuplicateKeyError if its code or URL is pending."""
+        if document["short_code"] in self.by_short_code:
+            raise DuplicateKeyError("short_code already pending", 11000, {"keyPattern": {"short_code": 1}})
+        if document.get("long_url_hash") in self.by_url_hash:
+            raise DuplicateKeyError("long_url_hash already pending", 11000, {"keyPattern": {"long_url_hash": 1}})
+
+        self._remember(document)
+        try:
+            await asyncio.to_thread(self._insert, document["short_code"], bson.encode(document))
+        except sqlite3.IntegrityError:
+            self._forget(document)
+            raise DuplicateKeyError("short_code already pending", 11000, {"keyPattern": {"short_code": 1}})
+        except BaseException:
+            self._forget(document)
+            raise
+
+        if len(self.by_short_code) >= self.batch_size:
+            self._wakeup.set()
+
+    async def flush(self) -> int:
+        """Group-commit journaled documents to MongoDB; returns how many were committed."""
+        committed = 0
+        async with self._flush_lock:
+            while True:
+                rows = await asyncio.to_thread(self._select, self.batch_size)
+                if not rows:
+                    return committed
+
+                documents = [bson.decode(row[1], codec_options=CODEC_OPTIONS) for row in rows]
+                done_ids = await self._insert_batch(rows, documents)
+                await asyncio.to_thread(self._delete, done_ids)
+                done = set(done_ids)
+                for row, document in zip(rows, documents):
+                    if row[0] in done:
+                        self._forget(document)
+                committed += len(done_ids)
+                if len(done_ids) < len(rows):
+                    return committed  # MongoDB is refusing writes; retry on the next tick
+
+    async def _insert_batch(self, rows: list, documents: list) -> list:
+        """Insert documents; return journal ids that are now safely in MongoDB (or can never be)."""
+        failed = {}
+        try:
+            with DB_LATENCY.time("mongo", "write_behind_insert_many"):
+                await collection.insert_many([dict(document) for document in documents], ordered=False)
+        except Exception as e:
+            details = getattr(e, "details", None) or {}
+            if "writeErrors" not in details:
+                logger.error(f"Write-behind flush failed, will retry: {e}")
+                return []
+            failed = {error["index"]: error for error in details["writeErrors"]}
+
+        done_ids = []
+        for position, (row, document) in enumerate(zip(rows, documents)):
+            error = failed.get(position)
+            if error is None:
+                done_ids.append(row[0])
+            elif error.get("code") == 11000:
+                # Either replayed after a crash (already inserted) or a genuine collision
+                if not await collection.find_one({"short_code": document["short_code"], "edit_id": document["edit_id"]}, {"_id": 1}):
+                    logger.error(f"Dropping journaled link '{document['short_code']}': {error.get('errmsg')}")
+                done_ids.append(row[0])
+            else:
+                logger.error(f"Write-behind insert of '{document['short_code']}' failed, will retry: {error.get('errmsg')}")
+        return done_ids
+
+    async def flush_edit_id(self, edit_id: str):
+        """Make sure a pending link is in MongoDB before it is edited."""
+        if edit_id in self.by_edit_id:
+            await self.flush()
+
+    async def start(self):
+        """Open the journal, replay rows left by a previous process, and start the flusher."""
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        await asyncio.to_thread(self._open)
+
+        rows = await asyncio.to_thread(self._select)
+        for _, document in rows:
+            self._remember(bson.decode(document, codec_options=CODEC_OPTIONS))
+        if rows:
+            logger.info(f"Replaying {len(rows)} journaled links from {self.path}")
+            await self.flush()
+
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Write-behind flush failed: {e}")
+
+    async def stop(self):
+        """Stop the flusher and commit whatever is left; unflushed rows stay journaled."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.flush()
+        finally:
+            await asyncio.to_thread(self._close)
+
+
+write_behind = WriteBehindJournal(
+    settings.write_behind_journal,
+    batch_size=settings.write_behind_batch_size,
+    flush_interval=settings.write_behind_flush_interval,
+)